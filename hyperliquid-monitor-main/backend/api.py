@@ -1,34 +1,61 @@
 """REST API surface for Hyperliquid monitoring data."""
 from __future__ import annotations
 
+import asyncio
+import base64
+import hashlib
+import heapq
+import hmac
 import logging
 import os
+import queue
 import secrets
 import smtplib
 import threading
 import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from decimal import Decimal
+from functools import lru_cache
 from email.header import Header
 from email.message import EmailMessage
-from typing import Any, Dict, List, Optional, Literal
+from typing import Any, Dict, List, Optional, Literal, Tuple
 
 import bcrypt
 import jwt
 import requests
 import schedule
-from fastapi import Depends, FastAPI, HTTPException, Query
+from fastapi import Depends, FastAPI, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from pydantic import BaseModel, EmailStr, Field
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:  # pragma: no cover - shipped with web3; only used for the logsBloom pre-check
+    from eth_utils import keccak as _keccak
+except ImportError:  # pragma: no cover - fall back to scanning every log
+    _keccak = None
+
+try:  # pragma: no cover - optional dependency
+    import orjson  # noqa: F401
+except ImportError:  # pragma: no cover - fall back to stdlib json
+    _DefaultResponse = JSONResponse
+else:
+    _DefaultResponse = ORJSONResponse
 
 from .database import (
     create_user,
-    get_user_by_email,
+    email_registered,
     get_user_by_id,
-    get_user_by_payment_hash,
+    get_user_credentials,
+    get_user_id_by_payment_hash,
     get_user_config,
-    list_users,
+    list_users_due_for_reminder,
+    bulk_update_user_field,
     update_user,
     upsert_user_config,
     upsert_email_verification,
@@ -37,6 +64,7 @@ from .database import (
     upsert_binance_follow_config,
     get_wecom_config,
     upsert_wecom_config,
+    transaction,
 )
 from .monitor_positions import (
     CONFIGURED_ADDRESSES,
@@ -55,6 +83,7 @@ from .monitor_positions import (
 from .monitor_service import (
     configure_user_monitor,
     initialise_monitors_from_db,
+    parse_wallet_addresses,
     shutdown_monitors,
 )
 from .binance_follow_service import (
@@ -68,6 +97,11 @@ JWT_SECRET = os.getenv("JWT_SECRET", "hyperliquid-monitor-secret")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 JWT_EXPIRES_MINUTES = int(os.getenv("JWT_EXPIRES_MINUTES", "43200"))
 TRIAL_DAYS = int(os.getenv("TRIAL_DAYS", "3"))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "10"))
+# Independent of JWT_SECRET so rotating the token key never invalidates
+# password hashes. Without it, passwords are stored as plain bcrypt.
+PASSWORD_PEPPER = os.getenv("PASSWORD_PEPPER", "").encode("utf-8") or None
+_PEPPERED_HASH_PREFIX = "hmac-sha256$"
 
 BSC_RPC_URL = os.getenv("BSC_RPC_URL", "https://bsc-dataseed.binance.org")
 BSCSCAN_API_KEY = os.getenv("BSCSCAN_API_KEY", "")
@@ -89,17 +123,230 @@ SMTP_USERNAME = os.getenv("SMTP_USERNAME", "")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
 SMTP_FROM = os.getenv("SMTP_FROM", SMTP_USERNAME or "")
 EMAIL_ENABLED = bool(SMTP_USERNAME and SMTP_PASSWORD)
+SMTP_MESSAGES_PER_CONNECTION = int(os.getenv("SMTP_MESSAGES_PER_CONNECTION", "100"))
+SMTP_IDLE_CHECK_SECONDS = 5.0
 
 TOKEN_MULTIPLIER = Decimal(10) ** USDT_DECIMALS
 REQUIRED_AMOUNT_WEI = int((SUBSCRIPTION_PRICE_USDT * TOKEN_MULTIPLIER).to_integral_value())
+# keccak256("Transfer(address,address,uint256)")
+_TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+
+
+def _address_bytes(name: str, address: str) -> bytes:
+    hex_part = address[2:] if address.startswith("0x") else address
+    try:
+        raw = bytes.fromhex(hex_part)
+    except ValueError:
+        raw = b""
+    if len(raw) != 20:
+        raise RuntimeError(f"{name} must be a 20-byte hex address (optionally 0x-prefixed), got {address!r}")
+    return raw
+
+
+_PAYMENT_TARGET_BYTES = _address_bytes("PAYMENT_TARGET_ADDRESS", PAYMENT_TARGET_ADDRESS)
+
+
+def _bloom_bits(item: bytes) -> int:
+    """Bits that ``item`` sets in a 2048-bit Ethereum logs bloom (yellow paper M3:2048)."""
+    digest = _keccak(item)
+    bits = 0
+    for index in (0, 2, 4):
+        bits |= 1 << (((digest[index] << 8) | digest[index + 1]) & 2047)
+    return bits
+
+
+# A qualifying receipt must contain the USDT contract, the Transfer topic and the
+# padded payment target topic, so all of their bloom bits have to be set.
+_PAYMENT_BLOOM_MASK = (
+    _bloom_bits(bytes.fromhex(USDT_CONTRACT[2:]))
+    | _bloom_bits(bytes.fromhex(_TRANSFER_TOPIC[2:]))
+    | _bloom_bits(bytes(12) + _PAYMENT_TARGET_BYTES)
+    if _keccak is not None
+    else 0
+)
+
+PRICE_CACHE_TTL_SECONDS = float(os.getenv("PRICE_CACHE_TTL_SECONDS", "2"))
+PRICE_CACHE_MAX_STALE_SECONDS = float(os.getenv("PRICE_CACHE_MAX_STALE_SECONDS", "60"))
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "10"))
+AUTH_CACHE_MAX_ENTRIES = 512
+JWT_CACHE_MAX_ENTRIES = 2048
+VERIFIED_PAYMENT_TTL_SECONDS = float(os.getenv("VERIFIED_PAYMENT_TTL_SECONDS", str(24 * 3600)))
+VERIFIED_PAYMENT_MAX_ENTRIES = 50_000
+REJECTED_PAYMENT_TTL_SECONDS = float(os.getenv("REJECTED_PAYMENT_TTL_SECONDS", "5"))
+RECEIPT_CACHE_TTL_SECONDS = float(os.getenv("RECEIPT_CACHE_TTL_SECONDS", "600"))
+RECEIPT_CACHE_MAX_ENTRIES = 10_000
+WALLET_LIST_CACHE_TTL_SECONDS = float(os.getenv("WALLET_LIST_CACHE_TTL_SECONDS", "20"))
+WALLET_SUMMARY_TTL = float(os.getenv("WALLET_SUMMARY_TTL", "2"))
+WALLET_SUMMARY_MAX_ENTRIES = 1024
 
 security = HTTPBearer(auto_error=False)
 logger = logging.getLogger(__name__)
 _scheduler_started = False
+_reminder_scheduler = schedule.Scheduler()
+_scheduler_stop = threading.Event()
+
+
+class _PriceCache:
+    """Share Hyperliquid mid prices across requests for a short TTL."""
+
+    def __init__(self, ttl: float) -> None:
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._expires_at = 0.0
+        self._prices: Dict[str, float] = {}
+        self._refreshed_at = 0.0
+
+    def get(self) -> Dict[str, float]:
+        if time.monotonic() < self._expires_at:
+            return self._prices
+        with self._lock:
+            # Another request may have refreshed while we waited for the lock.
+            if time.monotonic() < self._expires_at:
+                return self._prices
+            try:
+                prices = get_current_prices()
+            except Exception as exc:
+                if not self._prices or time.monotonic() - self._refreshed_at > PRICE_CACHE_MAX_STALE_SECONDS:
+                    raise
+                # Serve the last good snapshot and hold off retrying for another TTL,
+                # so an upstream outage is not hammered by every waiting request.
+                logger.warning("Serving stale prices after refresh failure: %s", exc)
+                self._expires_at = time.monotonic() + self._ttl
+                return self._prices
+            self._prices = prices
+            self._refreshed_at = time.monotonic()
+            self._expires_at = self._refreshed_at + self._ttl
+            return prices
+
+
+class _TTLCache:
+    """Small thread-safe LRU whose entries expire after a per-entry TTL."""
+
+    def __init__(self, max_entries: int) -> None:
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() >= entry[0]:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+
+_price_cache = _PriceCache(PRICE_CACHE_TTL_SECONDS)
+_verified_payments = _TTLCache(VERIFIED_PAYMENT_MAX_ENTRIES)
+_rejected_payments = _TTLCache(VERIFIED_PAYMENT_MAX_ENTRIES)
+_receipt_cache = _TTLCache(RECEIPT_CACHE_MAX_ENTRIES)
+_HTTP = requests.Session()
+_HTTP.mount(
+    "https://",
+    HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=Retry(total=2, backoff_factor=0.2)),
+)
+# Receipt lookups are read-only, so POSTs to the node may be retried on throttling too.
+_RPC_ADAPTER = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=32,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=(429, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "POST"}),
+        raise_on_status=False,
+    ),
+)
+for _rpc_url in (BSC_RPC_URL, BSCSCAN_BASE_URL):
+    if _rpc_url:
+        _HTTP.mount(_rpc_url, _RPC_ADAPTER)
+# Metrics fans out to 3 blocking calls per request; size the shared pool so
+# that many concurrent requests fit (anyio's own threadpool defaults to 40).
+API_IO_WORKERS = int(os.getenv("API_IO_WORKERS", str(3 * 40)))
+_io_pool = ThreadPoolExecutor(max_workers=API_IO_WORKERS, thread_name_prefix="api-io")
+_bcrypt_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="bcrypt")
+
+
+def _get_cached_prices() -> Dict[str, float]:
+    return _price_cache.get()
+
+
+_auth_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+_auth_cache_lock = threading.Lock()
+
+
+def _auth_cache_get(key: str) -> Optional[Dict[str, Any]]:
+    with _auth_cache_lock:
+        entry = _auth_cache.get(key)
+        if entry is None:
+            return None
+        expires_at, user = entry
+        if time.monotonic() >= expires_at:
+            del _auth_cache[key]
+            return None
+        _auth_cache.move_to_end(key)
+        return user
+
+
+def _auth_cache_put(key: str, user: Dict[str, Any], ttl: float) -> None:
+    with _auth_cache_lock:
+        _auth_cache[key] = (time.monotonic() + ttl, user)
+        _auth_cache.move_to_end(key)
+        while len(_auth_cache) > AUTH_CACHE_MAX_ENTRIES:
+            _auth_cache.popitem(last=False)
+
+
+def _invalidate_cached_user(user_id: int) -> None:
+    with _auth_cache_lock:
+        stale = [key for key, (_, user) in _auth_cache.items() if user.get("id") == user_id]
+        for key in stale:
+            del _auth_cache[key]
+
+
+_jwt_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+_jwt_cache_lock = threading.Lock()
+
+
+def _decode_token(token: str, cache_key: str) -> Dict[str, Any]:
+    """Verify a JWT once and reuse its payload until the token's own expiry."""
+    now = time.time()
+    with _jwt_cache_lock:
+        entry = _jwt_cache.get(cache_key)
+        if entry is not None:
+            if now < entry[0]:
+                _jwt_cache.move_to_end(cache_key)
+                return entry[1]
+            del _jwt_cache[cache_key]
+    # Expired or unseen tokens go through PyJWT so the usual errors are raised.
+    payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    expires_at = float(payload.get("exp", 0))
+    if expires_at > now:
+        with _jwt_cache_lock:
+            _jwt_cache[cache_key] = (expires_at, payload)
+            while len(_jwt_cache) > JWT_CACHE_MAX_ENTRIES:
+                _jwt_cache.popitem(last=False)
+    return payload
+
+
+_UTC = timezone.utc
 
 
 def _now() -> datetime:
-    return datetime.now(timezone.utc)
+    return datetime.now(_UTC)
+
+
+def _now_ms() -> int:
+    return time.time_ns() // 1_000_000
 
 
 def _create_access_token(user_id: int, email: str) -> str:
@@ -111,6 +358,7 @@ def _create_access_token(user_id: int, email: str) -> str:
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
 
+@lru_cache(maxsize=10_000)
 def _parse_iso(value: Optional[str]) -> Optional[datetime]:
     if not value:
         return None
@@ -120,16 +368,34 @@ def _parse_iso(value: Optional[str]) -> Optional[datetime]:
         return None
 
 
+@lru_cache(maxsize=10_000)
+def _end_times(
+    trial_raw: Optional[str], subscription_raw: Optional[str]
+) -> Tuple[Optional[str], Optional[str], Optional[float], Optional[float]]:
+    trial_end = _parse_iso(trial_raw)
+    subscription_end = _parse_iso(subscription_raw)
+    return (
+        trial_end.isoformat() if trial_end else None,
+        subscription_end.isoformat() if subscription_end else None,
+        trial_end.timestamp() if trial_end else None,
+        subscription_end.timestamp() if subscription_end else None,
+    )
+
+
+def _user_end_times(record: Dict[str, Any]) -> Tuple[Optional[str], Optional[str], Optional[float], Optional[float]]:
+    """Parsed trial/subscription ends, cached by their raw strings (the record is left untouched)."""
+    return _end_times(record.get("trial_end"), record.get("subscription_end"))
+
+
 def _serialize_user(record: Dict[str, Any]) -> Dict[str, Any]:
-    trial_end = _parse_iso(record.get("trial_end"))
-    subscription_end = _parse_iso(record.get("subscription_end"))
-    now = _now()
-    trial_active = bool(trial_end and now <= trial_end)
-    subscription_active = bool(subscription_end and now <= subscription_end)
+    trial_iso, subscription_iso, trial_ts, subscription_ts = _user_end_times(record)
+    now_ts = time.time()
+    trial_active = trial_ts is not None and now_ts <= trial_ts
+    subscription_active = subscription_ts is not None and now_ts <= subscription_ts
     return {
         "email": record["email"],
-        "trial_end": trial_end.isoformat() if trial_end else None,
-        "subscription_end": subscription_end.isoformat() if subscription_end else None,
+        "trial_end": trial_iso,
+        "subscription_end": subscription_iso,
         "trial_active": trial_active,
         "subscription_active": subscription_active,
         "can_access_monitor": bool(trial_active or subscription_active),
@@ -140,8 +406,12 @@ def _require_current_user(credentials: HTTPAuthorizationCredentials = Depends(se
     if credentials is None:
         raise HTTPException(status_code=401, detail="Authentication required")
     token = credentials.credentials
+    cache_key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    cached = _auth_cache_get(cache_key)
+    if cached is not None:
+        return cached
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        payload = _decode_token(token, cache_key)
     except jwt.ExpiredSignatureError as exc:
         raise HTTPException(status_code=401, detail="Token expired") from exc
     except jwt.PyJWTError as exc:  # pragma: no cover - generic decode error
@@ -153,6 +423,10 @@ def _require_current_user(credentials: HTTPAuthorizationCredentials = Depends(se
     user = get_user_by_id(int(user_id))
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
+    # Never keep a user cached past the token's own expiry.
+    ttl = min(AUTH_CACHE_TTL_SECONDS, float(payload.get("exp", 0)) - time.time())
+    if ttl > 0:
+        _auth_cache_put(cache_key, user, ttl)
     return user
 
 
@@ -167,7 +441,7 @@ def _build_binance_response(record: Dict[str, Any]) -> BinanceFollowConfigRespon
     mode = (record.get("mode") or "fixed").lower()
     if mode not in {"fixed", "percentage"}:
         mode = "fixed"
-    return BinanceFollowConfigResponse(
+    return BinanceFollowConfigResponse.model_construct(
         enabled=bool(record.get("enabled")),
         wallet_address=(record.get("wallet_address") or None),
         mode=mode,
@@ -187,7 +461,7 @@ def _build_wecom_response(record: Dict[str, Any]) -> "WecomConfigResponse":
     mentions = record.get("mentions") or []
     if isinstance(mentions, str):
         mentions = [item for item in mentions.split(",") if item]
-    return WecomConfigResponse(
+    return WecomConfigResponse.model_construct(
         enabled=bool(record.get("enabled")),
         webhook_url=record.get("webhook_url"),
         mentions=list(mentions),
@@ -299,6 +573,24 @@ class PaymentVerificationRequest(BaseModel):
     tx_hash: str = Field(..., alias="txHash")
 
 
+class PaymentBatchVerificationRequest(BaseModel):
+    tx_hashes: List[str] = Field(..., alias="txHashes", min_length=1, max_length=20)
+
+
+class PaymentVerificationResult(BaseModel):
+    tx_hash: str = Field(..., alias="txHash")
+    verified: bool
+    detail: Optional[str] = None
+
+    class Config:
+        populate_by_name = True
+
+
+class PaymentBatchVerificationResponse(BaseModel):
+    user: UserInfo
+    results: List[PaymentVerificationResult]
+
+
 class MonitorConfig(BaseModel):
     telegram_bot_token: Optional[str] = Field(None, alias="telegramBotToken")
     telegram_chat_id: Optional[str] = Field(None, alias="telegramChatId")
@@ -363,87 +655,154 @@ class WecomConfigRequest(BaseModel):
         populate_by_name = True
 
 
-def _format_side(size: float) -> str:
-    if size > 0:
-        return "long"
-    if size < 0:
-        return "short"
-    return "flat"
-
-
 def _generate_verification_code() -> str:
     return f"{secrets.randbelow(1_000_000):06d}"
 
 
-def _build_position_payload(position: Dict[str, Any], mark_prices: Dict[str, float]) -> PositionPayload:
+def _pepper_password(password: str) -> bytes:
+    digest = hmac.new(PASSWORD_PEPPER, password.encode("utf-8"), hashlib.sha256).digest()
+    return base64.b64encode(digest)
+
+
+def _hash_password(password: str) -> str:
+    if PASSWORD_PEPPER is None:
+        return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode("utf-8")
+    hashed = bcrypt.hashpw(_pepper_password(password), bcrypt.gensalt(rounds=BCRYPT_ROUNDS))
+    return _PEPPERED_HASH_PREFIX + hashed.decode("utf-8")
+
+
+def _check_password(password: str, stored_hash: str) -> bool:
+    if stored_hash.startswith(_PEPPERED_HASH_PREFIX):
+        if PASSWORD_PEPPER is None:
+            logger.error("Peppered password hash found but PASSWORD_PEPPER is not set")
+            return False
+        hashed = stored_hash[len(_PEPPERED_HASH_PREFIX):].encode("utf-8")
+        return bcrypt.checkpw(_pepper_password(password), hashed)
+    # Accounts created before peppering store a plain bcrypt hash of the password.
+    return bcrypt.checkpw(password.encode("utf-8"), stored_hash.encode("utf-8"))
+
+
+def _build_position_payload(
+    position: Dict[str, Any],
+    mark_prices: Dict[str, float],
+    updated_at_ms: int,
+) -> PositionPayload:
     coin = position.get("coin", "")
     size = _safe_float(position.get("szi"))
     position_value = abs(_safe_float(position.get("positionValue")))
     entry_price = _calculate_entry_price(position)
-    mark_price = _safe_float(mark_prices.get(coin))
+    # Mid prices are already floats from get_current_prices.
+    mark_price = mark_prices.get(coin, 0.0)
     margin_used = _safe_float(position.get("marginUsed")) or None
     leverage = _calculate_leverage(position)
     liquidation_price = (_safe_float(position.get("liquidationPx")) or None)
     pnl = _safe_float(position.get("unrealizedPnl")) or None
+    if size > 0:
+        side = "long"
+        abs_size = size
+    elif size < 0:
+        side = "short"
+        abs_size = -size
+    else:
+        side = "flat"
+        abs_size = 0.0
     pnl_percent: Optional[float] = None
-    if entry_price > 0 and abs(size) > 0:
-        pnl_percent = ((pnl or 0.0) / (entry_price * abs(size))) * 100
+    if entry_price > 0 and abs_size > 0:
+        pnl_percent = ((pnl or 0.0) / (entry_price * abs_size)) * 100
     funding = position.get("cumFunding") or {}
-    updated_at = int(time.time() * 1000)
 
-    return PositionPayload(
+    return PositionPayload.model_construct(
         coin=coin,
-        side=_format_side(size),
+        side=side,
         size=size,
-        entryPrice=entry_price if entry_price > 0 else None,
-        markPrice=mark_price if mark_price > 0 else None,
-        positionValue=position_value,
-        marginUsed=margin_used,
-        liquidationPrice=liquidation_price,
+        entry_price=entry_price if entry_price > 0 else None,
+        mark_price=mark_price if mark_price > 0 else None,
+        position_value=position_value,
+        margin_used=margin_used,
+        liquidation_price=liquidation_price,
         leverage=leverage,
-        unrealizedPnl=pnl,
-        pnlPercent=pnl_percent,
-        fundingAllTime=_safe_float(funding.get("allTime")) or None,
-        fundingSinceOpen=_safe_float(funding.get("sinceOpen")) or None,
-        updatedAt=updated_at,
+        unrealized_pnl=pnl,
+        pnl_percent=pnl_percent,
+        funding_all_time=_safe_float(funding.get("allTime")) or None,
+        funding_since_open=_safe_float(funding.get("sinceOpen")) or None,
+        updated_at=updated_at_ms,
     )
 
 
-def _compose_wallet_summary(address: str) -> WalletSummaryPayload:
-    try:
-        user_state = get_positions(address)
-    except Exception as exc:  # pragma: no cover - network layer
-        raise HTTPException(status_code=502, detail=f"Failed to fetch positions for {address}") from exc
-
-    positions_payload: List[PositionPayload] = []
-    prices: Dict[str, float] = {}
-    try:
-        prices = get_current_prices()
-    except Exception:  # pragma: no cover - network layer
+async def _compose_wallet_summary(address: str) -> WalletSummaryPayload:
+    # Prices are independent of the wallet, so fetch them alongside the positions
+    # on the I/O pool while the event loop stays free for other requests.
+    loop = asyncio.get_running_loop()
+    user_state, prices = await asyncio.gather(
+        loop.run_in_executor(_io_pool, get_positions, address),
+        loop.run_in_executor(_io_pool, _get_cached_prices),
+        return_exceptions=True,
+    )
+    if isinstance(user_state, Exception):  # pragma: no cover - network layer
+        raise HTTPException(status_code=502, detail=f"Failed to fetch positions for {address}") from user_state
+    if isinstance(prices, Exception):  # pragma: no cover - network layer
         prices = {}
 
-    positions_raw = user_state.get("assetPositions", []) or []
-    for entry in positions_raw:
-        position = entry.get("position", {})
+    return _build_wallet_summary(address, user_state, prices)
+
+
+_summary_cache = _TTLCache(WALLET_SUMMARY_MAX_ENTRIES)
+_summary_inflight: Dict[str, "asyncio.Future[WalletSummaryPayload]"] = {}
+
+
+async def _cached_wallet_summary(address: str) -> WalletSummaryPayload:
+    """Serve recent summaries from memory and collapse concurrent refreshes per address."""
+    if WALLET_SUMMARY_TTL <= 0:
+        return await _compose_wallet_summary(address)
+    # Keyed on the address as requested, since the payload echoes it back.
+    key = address
+    cached = _summary_cache.get(key)
+    if cached is not None:
+        return cached
+    task = _summary_inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_compose_wallet_summary(address))
+        _summary_inflight[key] = task
+
+        def _finish(done: "asyncio.Future[WalletSummaryPayload]") -> None:
+            _summary_inflight.pop(key, None)
+            if not done.cancelled() and done.exception() is None:
+                _summary_cache.put(key, done.result(), WALLET_SUMMARY_TTL)
+
+        task.add_done_callback(_finish)
+    # Shield so one client disconnecting does not cancel the fetch for the others.
+    return await asyncio.shield(task)
+
+
+def _build_wallet_summary(
+    address: str,
+    user_state: Dict[str, Any],
+    prices: Dict[str, float],
+) -> WalletSummaryPayload:
+    now_ms = _now_ms()
+    positions_payload: List[PositionPayload] = []
+    total_position_value = 0.0
+    build_payload = _build_position_payload
+    for entry in user_state.get("assetPositions") or []:
+        position = entry.get("position")
         if not position:
             continue
-        positions_payload.append(_build_position_payload(position, prices))
+        item = build_payload(position, prices, now_ms)
+        positions_payload.append(item)
+        total_position_value += item.position_value
 
     balance = _extract_account_value(user_state)
     withdrawable = _safe_float(user_state.get("withdrawable")) or None
     margin_summary = user_state.get("marginSummary") or {}
     equity = _safe_float(margin_summary.get("accountValue")) or None
-    total_position_value = sum(item.position_value for item in positions_payload)
-
-    timestamp = int(time.time() * 1000)
 
-    return WalletSummaryPayload(
+    return WalletSummaryPayload.model_construct(
         address=address,
         balance=balance,
         withdrawable=withdrawable,
         equity=equity,
-        totalPositionValue=total_position_value,
-        timestamp=timestamp,
+        total_position_value=total_position_value,
+        timestamp=now_ms,
         positions=positions_payload,
     )
 
@@ -458,55 +817,84 @@ def _compose_fills(
     except Exception as exc:  # pragma: no cover - network layer
         raise HTTPException(status_code=502, detail=f"Failed to fetch fills for {address}") from exc
 
-    sorted_fills = sorted(fills_data, key=lambda item: _safe_int(item.get("time")), reverse=True)
+    safe_int = _safe_int
+    safe_float = _safe_float
+    latest_fills = heapq.nlargest(limit, fills_data, key=lambda item: safe_int(item.get("time")))
 
     payload: List[FillPayload] = []
-    for fill in sorted_fills[:limit]:
+    for fill in latest_fills:
         coin = fill.get("coin", "")
-        price = _safe_float(fill.get("px"))
-        size = _safe_float(fill.get("sz"))
+        price = safe_float(fill.get("px"))
+        size = safe_float(fill.get("sz"))
         side_raw = str(fill.get("side", "")).upper()
         side = "buy" if side_raw == "B" else "sell" if side_raw == "A" else side_raw
-        time_ms = _safe_int(fill.get("time"))
-        start_position = _safe_float(fill.get("startPosition")) if fill.get("startPosition") is not None else None
-        end_position = _safe_float(fill.get("endPosition")) if fill.get("endPosition") is not None else None
+        time_ms = safe_int(fill.get("time"))
+        start_position = safe_float(fill.get("startPosition")) if fill.get("startPosition") is not None else None
+        end_position = safe_float(fill.get("endPosition")) if fill.get("endPosition") is not None else None
         tx_hash = _extract_tx_hash(fill)
 
         payload.append(
-            FillPayload(
+            FillPayload.model_construct(
                 coin=coin,
                 side=side,
                 price=price,
                 size=size,
-                timeMs=time_ms,
-                startPosition=start_position,
-                endPosition=end_position,
-                txHash=tx_hash,
+                time_ms=time_ms,
+                start_position=start_position,
+                end_position=end_position,
+                tx_hash=tx_hash,
             )
         )
 
-    return FillListPayload(address=address, count=len(payload), items=payload)
+    return FillListPayload.model_construct(address=address, count=len(payload), items=payload)
+
+
+_wallet_list_lock = threading.Lock()
+_wallet_list_cache: Tuple[float, List[str]] = (0.0, [])
 
 
 def _list_known_wallets() -> List[str]:
+    global _wallet_list_cache
+    expires_at, wallets = _wallet_list_cache
+    if time.monotonic() < expires_at:
+        return list(wallets)
+    with _wallet_list_lock:
+        expires_at, wallets = _wallet_list_cache
+        if time.monotonic() >= expires_at:
+            wallets = _load_known_wallets()
+            _wallet_list_cache = (time.monotonic() + WALLET_LIST_CACHE_TTL_SECONDS, wallets)
+    return list(wallets)
+
+
+def _invalidate_known_wallets() -> None:
+    global _wallet_list_cache
+    with _wallet_list_lock:
+        _wallet_list_cache = (0.0, [])
+
+
+def _load_known_wallets() -> List[str]:
     state = load_position_state()
-    state_wallets = list(state.keys())
-    configured = list(CONFIGURED_ADDRESSES)
-    merged = sorted({*(wallet for wallet in state_wallets if wallet), *(wallet for wallet in configured if wallet)})
-    return merged
+    # /wallets has always returned a sorted list; keep that contract.
+    merged = dict.fromkeys(state)
+    merged.update(dict.fromkeys(CONFIGURED_ADDRESSES))
+    merged.pop("", None)
+    merged.pop(None, None)
+    return sorted(merged)
 
 
-app = FastAPI(title="Hyperliquid Monitor API", version="0.1.0")
+app = FastAPI(title="Hyperliquid Monitor API", version="0.1.0", default_response_class=_DefaultResponse)
 
-allowed_origins = [
-    origin.strip()
-    for origin in os.getenv("API_ALLOWED_ORIGINS", "http://localhost:5173,http://127.0.0.1:5173").split(",")
-    if origin.strip()
-]
+allowed_origins = tuple(
+    origin
+    for origin in (
+        raw.strip() for raw in os.getenv("API_ALLOWED_ORIGINS", "http://localhost:5173,http://127.0.0.1:5173").split(",")
+    )
+    if origin
+)
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=allowed_origins or ["*"],
+    allow_origins=allowed_origins or ("*",),
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -522,13 +910,22 @@ def startup_event() -> None:
 
 @app.on_event("shutdown")
 def shutdown_event() -> None:
+    _scheduler_stop.set()
     shutdown_monitors()
     shutdown_followers()
+    _email_sender.close()
+    _io_pool.shutdown(wait=False)
+    _HTTP.close()
+    _bcrypt_pool.shutdown(wait=False)
+
+
+_HEALTH_BODY = b'{"status":"ok","timestamp":%d}'
 
 
 @app.get("/api/health")
-def healthcheck() -> Dict[str, Any]:
-    return {"status": "ok", "timestamp": int(time.time() * 1000)}
+async def healthcheck() -> Response:
+    # Load balancers poll this constantly; skip the JSON encoder entirely.
+    return Response(_HEALTH_BODY % _now_ms(), media_type="application/json")
 
 
 @app.get("/api/wallets", response_model=WalletListPayload)
@@ -540,42 +937,57 @@ def list_wallets() -> WalletListPayload:
 
 @app.get("/api/wallets/{address}", response_model=WalletSummaryPayload)
 @app.get("/wallets/{address}", response_model=WalletSummaryPayload)
-def wallet_summary(address: str) -> WalletSummaryPayload:
-    return _compose_wallet_summary(address)
+async def wallet_summary(address: str) -> WalletSummaryPayload:
+    return await _cached_wallet_summary(address)
 
 
 @app.get("/api/wallets/{address}/positions", response_model=WalletSummaryPayload)
 @app.get("/wallets/{address}/positions", response_model=WalletSummaryPayload)
-def wallet_positions(address: str) -> WalletSummaryPayload:
-    return wallet_summary(address)
+async def wallet_positions(address: str) -> WalletSummaryPayload:
+    return await _cached_wallet_summary(address)
 
 
 @app.get("/api/wallets/{address}/fills", response_model=FillListPayload)
 @app.get("/wallets/{address}/fills", response_model=FillListPayload)
-def wallet_fills(address: str, limit: int = Query(50, ge=1, le=200)) -> FillListPayload:
-    return _compose_fills(address, limit)
+async def wallet_fills(address: str, limit: int = Query(50, ge=1, le=200)) -> FillListPayload:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_io_pool, _compose_fills, address, limit)
 
 
 @app.get("/api/wallets/{address}/metrics", response_model=WalletMetricsPayload)
 @app.get("/wallets/{address}/metrics", response_model=WalletMetricsPayload)
-def wallet_metrics(address: str) -> WalletMetricsPayload:
-    summary = wallet_summary(address)
-    try:
-        fills_raw = get_trade_history(address)
-    except Exception as exc:  # pragma: no cover - network layer
-        raise HTTPException(status_code=502, detail=f"Failed to fetch fills for {address}") from exc
+async def wallet_metrics(address: str) -> WalletMetricsPayload:
+    loop = asyncio.get_running_loop()
+    user_state, prices, fills_raw = await asyncio.gather(
+        loop.run_in_executor(_io_pool, get_positions, address),
+        loop.run_in_executor(_io_pool, _get_cached_prices),
+        loop.run_in_executor(_io_pool, get_trade_history, address),
+        return_exceptions=True,
+    )
+    if isinstance(user_state, Exception):  # pragma: no cover - network layer
+        raise HTTPException(status_code=502, detail=f"Failed to fetch positions for {address}") from user_state
+    if isinstance(prices, Exception):  # pragma: no cover - network layer
+        prices = {}
+    if isinstance(fills_raw, Exception):  # pragma: no cover - network layer
+        raise HTTPException(status_code=502, detail=f"Failed to fetch fills for {address}") from fills_raw
+
+    summary = _build_wallet_summary(address, user_state, prices)
 
     fills_payload = _compose_fills(address, limit=200, fills=fills_raw)
+    # Bucket fills once so each position only scans its own coin's fills.
+    fills_by_coin: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for fill in fills_raw or []:
+        fills_by_coin[fill.get("coin")].append(fill)
     per_coin: Dict[str, Dict[str, float]] = {}
     for position in summary.positions:
-        metrics = calculate_position_metrics(position.coin, fills_raw)
-        per_coin[position.coin] = metrics
+        coin = position.coin
+        per_coin[coin] = calculate_position_metrics(coin, fills_by_coin.get(coin, []))
 
-    return WalletMetricsPayload(
+    return WalletMetricsPayload.model_construct(
         address=address,
         summary=summary,
         fills=fills_payload,
-        perCoin=per_coin,
+        per_coin=per_coin,
     )
 
 
@@ -594,27 +1006,47 @@ def request_email_verification(payload: VerificationRequest) -> Dict[str, str]:
     return {"detail": "Verification code sent"}
 
 
+def _create_verified_user(email: str, verification_code: str, password_hash: str) -> Dict[str, Any]:
+    # Consuming the code and creating the account commit together: a failed
+    # insert no longer burns the user's verification code.
+    with transaction():
+        if not consume_email_verification(email, verification_code):
+            raise HTTPException(status_code=400, detail="Invalid or expired verification code")
+        return create_user(email, password_hash, TRIAL_DAYS)
+
+
+# The auth handlers stay async: SQLite calls go to the threadpool and bcrypt to
+# its CPU-sized pool, each awaited, so no worker thread sits waiting on the other.
 @app.post("/api/auth/register", response_model=AuthResponse)
-def register(payload: RegisterRequest) -> AuthResponse:
+async def register(payload: RegisterRequest) -> AuthResponse:
     email = payload.email.lower()
-    if not consume_email_verification(email, payload.verification_code):
-        raise HTTPException(status_code=400, detail="Invalid or expired verification code")
     if len(payload.password) < 6:
         raise HTTPException(status_code=400, detail="Password must be at least 6 characters long")
-    if get_user_by_email(email):
+    if await run_in_threadpool(email_registered, email):
         raise HTTPException(status_code=409, detail="Email already registered")
 
-    password_hash = bcrypt.hashpw(payload.password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
-    user_record = create_user(email, password_hash, TRIAL_DAYS)
+    loop = asyncio.get_running_loop()
+    # Hash before taking the write lock so the transaction stays short.
+    password_hash = await loop.run_in_executor(_bcrypt_pool, _hash_password, payload.password)
+    user_record = await run_in_threadpool(_create_verified_user, email, payload.verification_code, password_hash)
     token = _create_access_token(user_record["id"], user_record["email"])
     return AuthResponse(token=token, user=UserInfo(**_serialize_user(user_record)))
 
 
 @app.post("/api/auth/login", response_model=AuthResponse)
-def login(payload: LoginRequest) -> AuthResponse:
-    user_record = get_user_by_email(payload.email.lower())
-    if not user_record or not bcrypt.checkpw(payload.password.encode("utf-8"), user_record["password_hash"].encode("utf-8")):
+async def login(payload: LoginRequest) -> AuthResponse:
+    user_record = await run_in_threadpool(get_user_credentials, payload.email.lower())
+    if not user_record:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+    loop = asyncio.get_running_loop()
+    stored_hash = user_record["password_hash"]
+    password_ok = await loop.run_in_executor(_bcrypt_pool, _check_password, payload.password, stored_hash)
+    if not password_ok:
         raise HTTPException(status_code=401, detail="Invalid email or password")
+    if PASSWORD_PEPPER is not None and not stored_hash.startswith(_PEPPERED_HASH_PREFIX):
+        # Upgrade legacy hashes on the first successful login.
+        upgraded = await loop.run_in_executor(_bcrypt_pool, _hash_password, payload.password)
+        await run_in_threadpool(update_user, user_record["id"], password_hash=upgraded)
     token = _create_access_token(user_record["id"], user_record["email"])
     return AuthResponse(token=token, user=UserInfo(**_serialize_user(user_record)))
 
@@ -624,17 +1056,12 @@ def me(current_user: Dict[str, Any] = Depends(_require_current_user)) -> UserInf
     return UserInfo(**_serialize_user(current_user))
 
 
-@app.post("/api/subscription/verify", response_model=UserInfo)
-def verify_subscription(
-    payload: PaymentVerificationRequest,
-    current_user: Dict[str, Any] = Depends(_require_current_user),
-) -> UserInfo:
-    tx_hash = payload.tx_hash.lower()
+def _apply_subscription_payment(current_user: Dict[str, Any], tx_hash: str) -> Dict[str, Any]:
     if current_user.get("last_payment_hash") == tx_hash:
-        return UserInfo(**_serialize_user(current_user))
+        return current_user
 
-    existing_owner = get_user_by_payment_hash(tx_hash)
-    if existing_owner and existing_owner["id"] != current_user["id"]:
+    existing_owner_id = get_user_id_by_payment_hash(tx_hash)
+    if existing_owner_id is not None and existing_owner_id != current_user["id"]:
         raise HTTPException(status_code=400, detail="Transaction hash already used by another account")
 
     payment_data = _verify_payment_on_chain(tx_hash)
@@ -652,6 +1079,7 @@ def verify_subscription(
         last_payment_hash=tx_hash,
         last_reminder_at=None,
     )
+    _invalidate_cached_user(current_user["id"])
     refreshed = get_user_by_id(current_user["id"])
     if refreshed and EMAIL_ENABLED:
         body = (
@@ -660,7 +1088,36 @@ def verify_subscription(
         )
         _send_email(refreshed["email"], "Hyperliquid Monitor 订阅已激活", body)
 
-    return UserInfo(**_serialize_user(refreshed or current_user))
+    return refreshed or current_user
+
+
+@app.post("/api/subscription/verify", response_model=UserInfo)
+def verify_subscription(
+    payload: PaymentVerificationRequest,
+    current_user: Dict[str, Any] = Depends(_require_current_user),
+) -> UserInfo:
+    user = _apply_subscription_payment(current_user, payload.tx_hash.lower())
+    return UserInfo(**_serialize_user(user))
+
+
+@app.post("/api/payments/verify_batch", response_model=PaymentBatchVerificationResponse)
+def verify_subscription_batch(
+    payload: PaymentBatchVerificationRequest,
+    current_user: Dict[str, Any] = Depends(_require_current_user),
+) -> PaymentBatchVerificationResponse:
+    tx_hashes = list(dict.fromkeys(item.strip().lower() for item in payload.tx_hashes if item.strip()))
+    # One batched JSON-RPC call warms the receipt cache for every hash.
+    _get_tx_receipts_batch(tx_hashes)
+    user = current_user
+    results: List[PaymentVerificationResult] = []
+    for tx_hash in tx_hashes:
+        try:
+            user = _apply_subscription_payment(user, tx_hash)
+        except HTTPException as exc:
+            results.append(PaymentVerificationResult(tx_hash=tx_hash, verified=False, detail=str(exc.detail)))
+            continue
+        results.append(PaymentVerificationResult(tx_hash=tx_hash, verified=True))
+    return PaymentBatchVerificationResponse(user=UserInfo(**_serialize_user(user)), results=results)
 
 
 @app.get("/api/config", response_model=MonitorConfig)
@@ -684,7 +1141,7 @@ def update_monitor_config(
     current_user: Dict[str, Any] = Depends(_require_current_user),
 ) -> MonitorConfig:
     _ensure_monitor_access(current_user)
-    wallets = [addr.strip() for addr in payload.wallet_addresses if addr.strip()]
+    wallets = parse_wallet_addresses(payload.wallet_addresses)
     language = (payload.language or "zh").lower()
     if language not in {"zh", "en"}:
         language = "zh"
@@ -713,6 +1170,7 @@ def update_monitor_config(
         wecom_webhook_url=wecom_config.get("webhook_url"),
         wecom_mentions=wecom_config.get("mentions", []),
     )
+    _invalidate_known_wallets()
     uses_default = not record.get("telegram_bot_token") and bool(DEFAULT_TELEGRAM_BOT_TOKEN)
     return MonitorConfig(
         telegram_bot_token=None if uses_default else record.get("telegram_bot_token"),
@@ -837,12 +1295,110 @@ def save_wecom_config(
     return _build_wecom_response(record)
 
 
+def _topic_address_bytes(topic: str) -> bytes:
+    """Return the 20 address bytes of an indexed topic (case-insensitive), or b"" if malformed."""
+    if len(topic) != 66:
+        return b""
+    try:
+        return bytes.fromhex(topic[26:])
+    except ValueError:
+        return b""
+
+
 def _topic_to_address(topic: str) -> str:
     if topic.startswith("0x") and len(topic) == 66:
         return "0x" + topic[-40:]
     return topic
 
 
+class _EmailSender:
+    """Deliver mail from a background thread over one reused SMTP session."""
+
+    def __init__(self) -> None:
+        self._queue: "queue.Queue[Optional[EmailMessage]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._server: Optional[smtplib.SMTP] = None
+        self._sent_on_server = 0
+        self._last_used = 0.0
+
+    def enqueue(self, message: EmailMessage) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="smtp-sender", daemon=True)
+                self._thread.start()
+        self._queue.put(message)
+
+    def close(self) -> None:
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join(timeout=10)
+
+    def _run(self) -> None:
+        while True:
+            message = self._queue.get()
+            if message is None:
+                break
+            try:
+                self._deliver(message)
+            except Exception as exc:  # pragma: no cover - email failures are non-critical
+                logger.warning("Failed to send email to %s: %s", message["To"], exc)
+        self._disconnect()
+
+    def _deliver(self, message: EmailMessage) -> None:
+        try:
+            self._session().send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            self._disconnect()
+            self._session().send_message(message)
+        self._last_used = time.monotonic()
+        self._sent_on_server += 1
+        # Providers cap messages per connection; reconnect before hitting the quota.
+        if self._sent_on_server >= SMTP_MESSAGES_PER_CONNECTION:
+            self._disconnect()
+
+    def _session(self) -> smtplib.SMTP:
+        server = self._server
+        if server is not None:
+            # Back-to-back sends (e.g. a reminder sweep) skip the NOOP round-trip.
+            if time.monotonic() - self._last_used < SMTP_IDLE_CHECK_SECONDS:
+                return server
+            try:
+                if server.noop()[0] == 250:
+                    return server
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._disconnect()
+        clean_username = (SMTP_USERNAME or "").replace("\u00a0", "").strip()
+        clean_password = (SMTP_PASSWORD or "").replace("\u00a0", "").strip()
+        server = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30)
+        try:
+            server.starttls()
+            server.login(clean_username, clean_password)
+        except Exception:
+            server.close()
+            raise
+        self._server = server
+        return server
+
+    def _disconnect(self) -> None:
+        server = self._server
+        self._server = None
+        self._sent_on_server = 0
+        if server is None:
+            return
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+
+_email_sender = _EmailSender()
+
+
 def _send_email(recipient: str, subject: str, body: str) -> None:
     if not EMAIL_ENABLED or not recipient:
         return
@@ -852,27 +1408,70 @@ def _send_email(recipient: str, subject: str, body: str) -> None:
     if not clean_from and SMTP_USERNAME:
         clean_from = SMTP_USERNAME.strip()
     clean_body = (body or "").replace("\u00a0", " ").strip()
-    clean_username = (SMTP_USERNAME or "").replace("\u00a0", "").strip()
-    clean_password = (SMTP_PASSWORD or "").replace("\u00a0", "").strip()
     message = EmailMessage()
     message["Subject"] = str(Header(clean_subject, "utf-8"))
     message["From"] = clean_from
     message["To"] = clean_recipient
     message.set_content(clean_body, charset="utf-8")
-    try:
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30) as server:
-            server.starttls()
-            server.login(clean_username, clean_password)
-            server.send_message(message)
-    except Exception as exc:  # pragma: no cover - email failures are non-critical
-        logger.warning("Failed to send email to %s: %s", clean_recipient or recipient, exc)
+    _email_sender.enqueue(message)
 
 
 def _get_tx_receipt(tx_hash: str) -> Dict[str, Any]:
+    cache_key = tx_hash.lower()
+    cached = _receipt_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    receipt = _fetch_tx_receipt(tx_hash)
+    # Only mined receipts are final enough to reuse; pending lookups raise above.
+    if isinstance(receipt, dict) and receipt.get("blockNumber"):
+        _receipt_cache.put(cache_key, receipt, RECEIPT_CACHE_TTL_SECONDS)
+    return receipt
+
+
+def _get_tx_receipts_batch(tx_hashes: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Fetch several receipts in one JSON-RPC batch, reusing and filling the receipt cache."""
+    receipts: Dict[str, Dict[str, Any]] = {}
+    missing: List[str] = []
+    for tx_hash in dict.fromkeys(item.lower() for item in tx_hashes):
+        cached = _receipt_cache.get(tx_hash)
+        if cached is not None:
+            receipts[tx_hash] = cached
+        else:
+            missing.append(tx_hash)
+    if not missing or not BSC_RPC_URL:
+        return receipts
+
+    payload = [
+        {"jsonrpc": "2.0", "method": "eth_getTransactionReceipt", "params": [tx_hash], "id": index}
+        for index, tx_hash in enumerate(missing)
+    ]
+    try:
+        response = _HTTP.post(BSC_RPC_URL, json=payload, timeout=30)
+        response.raise_for_status()
+        replies = response.json()
+    except Exception as exc:
+        # Callers fall back to _get_tx_receipt (and BscScan) one hash at a time.
+        logger.warning("Batched BSC RPC (%s) failed for %d txs: %s", BSC_RPC_URL, len(missing), exc)
+        return receipts
+    if not isinstance(replies, list):
+        return receipts
+    for reply in replies:
+        index = reply.get("id") if isinstance(reply, dict) else None
+        receipt = reply.get("result") if isinstance(reply, dict) else None
+        if not isinstance(index, int) or not 0 <= index < len(missing):
+            continue
+        if isinstance(receipt, dict) and receipt.get("blockNumber"):
+            tx_hash = missing[index]
+            _receipt_cache.put(tx_hash, receipt, RECEIPT_CACHE_TTL_SECONDS)
+            receipts[tx_hash] = receipt
+    return receipts
+
+
+def _fetch_tx_receipt(tx_hash: str) -> Dict[str, Any]:
     if BSC_RPC_URL:
         try:
             payload = {"jsonrpc": "2.0", "method": "eth_getTransactionReceipt", "params": [tx_hash], "id": 1}
-            response = requests.post(BSC_RPC_URL, json=payload, timeout=30)
+            response = _HTTP.post(BSC_RPC_URL, json=payload, timeout=30)
             response.raise_for_status()
             data = response.json()
             if "error" in data and data["error"]:
@@ -897,7 +1496,7 @@ def _get_tx_receipt(tx_hash: str) -> Dict[str, Any]:
         "txhash": tx_hash,
         "apikey": BSCSCAN_API_KEY,
     }
-    response = requests.get(BSCSCAN_BASE_URL, params=params, timeout=30)
+    response = _HTTP.get(BSCSCAN_BASE_URL, params=params, timeout=30)
     response.raise_for_status()
     payload = response.json()
     status_flag = payload.get("status")
@@ -918,23 +1517,62 @@ def _get_tx_receipt(tx_hash: str) -> Dict[str, Any]:
 
 
 def _verify_payment_on_chain(tx_hash: str) -> Dict[str, Any]:
+    # Confirmed transfers never change, so retries can skip the RPC round-trip.
+    # Rejections (pending, failed or non-qualifying txs) are remembered only
+    # briefly so a user hammering "verify" does not hit the node every time.
+    cache_key = tx_hash.lower()
+    cached = _verified_payments.get(cache_key)
+    if cached is not None:
+        return dict(cached)
+    rejected = _rejected_payments.get(cache_key)
+    if rejected is not None:
+        raise HTTPException(status_code=400, detail=rejected)
+    try:
+        payment = _scan_payment_receipt(tx_hash)
+    except HTTPException as exc:
+        if exc.status_code == 400 and REJECTED_PAYMENT_TTL_SECONDS > 0:
+            _rejected_payments.put(cache_key, exc.detail, REJECTED_PAYMENT_TTL_SECONDS)
+        raise
+    _verified_payments.put(cache_key, payment, VERIFIED_PAYMENT_TTL_SECONDS)
+    return dict(payment)
+
+
+def _bloom_may_contain_payment(logs_bloom: Any) -> bool:
+    if not isinstance(logs_bloom, str) or len(logs_bloom) != 514:
+        return True  # missing or malformed bloom: fall back to the full log scan
+    try:
+        bloom = int(logs_bloom, 16)
+    except ValueError:
+        return True
+    return bloom & _PAYMENT_BLOOM_MASK == _PAYMENT_BLOOM_MASK
+
+
+def _scan_payment_receipt(tx_hash: str) -> Dict[str, Any]:
     result = _get_tx_receipt(tx_hash)
     if isinstance(result, str):
         raise HTTPException(status_code=502, detail=f"BSC RPC returned invalid result: {result}")
     if "status" in result and result.get("status") == "0x0":
         raise HTTPException(status_code=400, detail="Transaction failed on chain")
 
-    contract = USDT_CONTRACT.lower()
-    target = PAYMENT_TARGET_ADDRESS.lower()
+    if _PAYMENT_BLOOM_MASK and not _bloom_may_contain_payment(result.get("logsBloom")):
+        raise HTTPException(status_code=400, detail="No qualifying USDT transfer to the monitored address was found in the transaction")
+
+    # USDT_CONTRACT and _TRANSFER_TOPIC are lowercased at import. Nodes normally
+    # return lowercase hex too, so .lower() only runs when the cheap compare misses.
+    contract = USDT_CONTRACT
+    transfer_topic = _TRANSFER_TOPIC
     logs = result.get("logs", [])
     for entry in logs:
-        if entry.get("address", "").lower() != contract:
+        address = entry.get("address", "")
+        if address != contract and address.lower() != contract:
             continue
         topics = entry.get("topics") or []
         if len(topics) < 3:
             continue
-        to_address = _topic_to_address(topics[2]).lower()
-        if to_address != target:
+        event_topic = topics[0]
+        if event_topic != transfer_topic and event_topic.lower() != transfer_topic:
+            continue
+        if _topic_address_bytes(topics[2]) != _PAYMENT_TARGET_BYTES:
             continue
         amount_raw = int(entry.get("data", "0x0"), 16)
         if amount_raw < REQUIRED_AMOUNT_WEI:
@@ -952,20 +1590,30 @@ def _verify_payment_on_chain(tx_hash: str) -> Dict[str, Any]:
 def _check_subscription_reminders() -> None:
     now = _now()
     upcoming_threshold = now + timedelta(days=REMINDER_LEAD_DAYS)
-    for user in list_users():
-        subscription_end = _parse_iso(user.get("subscription_end"))
-        if not subscription_end or subscription_end <= now or subscription_end > upcoming_threshold:
-            continue
-        last_reminder = _parse_iso(user.get("last_reminder_at"))
-        if last_reminder and (now - last_reminder) < timedelta(days=1):
-            continue
-        if EMAIL_ENABLED:
-            body = (
-                "您的 Hyperliquid Monitor 订阅将于 "
-                f"{subscription_end.isoformat()} 到期，请及时续费以继续使用监控配置功能。"
-            )
-            _send_email(user["email"], "Hyperliquid Monitor 订阅即将到期", body)
-        update_user(user["id"], last_reminder_at=now.isoformat())
+    due_users = list_users_due_for_reminder(
+        now.isoformat(),
+        upcoming_threshold.isoformat(),
+        (now - timedelta(days=1)).isoformat(),
+    )
+    now_iso = now.isoformat()
+    reminded: List[Tuple[str, int]] = []
+    try:
+        # list_users_due_for_reminder already applied the expiry window and the
+        # once-a-day limit in SQL, so every row here is due.
+        for user in due_users:
+            if EMAIL_ENABLED:
+                body = (
+                    "您的 Hyperliquid Monitor 订阅将于 "
+                    f"{user['subscription_end']} 到期，请及时续费以继续使用监控配置功能。"
+                )
+                _send_email(user["email"], "Hyperliquid Monitor 订阅即将到期", body)
+            reminded.append((now_iso, user["id"]))
+    finally:
+        # Record everyone reminded so far in one transaction, even if a later
+        # send blew up.
+        bulk_update_user_field("last_reminder_at", reminded)
+        for _, user_id in reminded:
+            _invalidate_cached_user(user_id)
 
 
 def _start_scheduler() -> None:
@@ -974,14 +1622,19 @@ def _start_scheduler() -> None:
         return
     _scheduler_started = True
     try:
-        schedule.clear("subscription-reminders")
+        _reminder_scheduler.clear("subscription-reminders")
     except Exception:  # pragma: no cover - scheduler exceptions are non-critical
         pass
-    schedule.every().day.at(REMINDER_TIME).do(_check_subscription_reminders).tag("subscription-reminders")
+    _reminder_scheduler.every().day.at(REMINDER_TIME).do(_check_subscription_reminders).tag("subscription-reminders")
 
     def runner() -> None:
-        while True:
-            schedule.run_pending()
-            time.sleep(60)
-
-    threading.Thread(target=runner, daemon=True).start()
+        while not _scheduler_stop.is_set():
+            # Sleep until the next job is due instead of polling every minute; the
+            # cap keeps the loop honest if the wall clock jumps.
+            idle = _reminder_scheduler.idle_seconds
+            delay = 3600.0 if idle is None else min(max(idle, 1.0), 3600.0)
+            if _scheduler_stop.wait(delay):
+                break
+            _reminder_scheduler.run_pending()
+
+    threading.Thread(target=runner, name="subscription-reminders", daemon=True).start()
@@ -1,11 +1,18 @@
-import importlib
+import atexit
+import hashlib
 import logging
-import queue
 import threading
 import time
-from dataclasses import dataclass, replace
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from decimal import ROUND_DOWN, Decimal
+from functools import lru_cache
 import os
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 try:  # Binance SDK 为可选依赖，未安装时提供兼容处理
     from binance.error import ClientError  # type: ignore
@@ -22,29 +29,242 @@ except ModuleNotFoundError:  # pragma: no cover - fallback when SDK missing
             self.status_code = status_code
             self.error_message = error_message or message or ""
 
+_UMFUTURES_INCOMPATIBLE = False
+try:
+    from binance.um_futures import UMFutures as _UMFutures  # type: ignore
+except ModuleNotFoundError:  # pragma: no cover - fallback when SDK missing
+    _UMFutures = None  # type: ignore[assignment]
+except ImportError:  # pragma: no cover - SDK present but without UMFutures
+    _UMFutures = None  # type: ignore[assignment]
+    _UMFUTURES_INCOMPATIBLE = True
+
 from .database import (
+    bulk_update_binance_follow_status,
     get_binance_follow_config,
-    list_users,
-    update_binance_follow_status,
+    list_binance_follow_configs,
 )
 
 logger = logging.getLogger(__name__)
 
 _BINANCE_API_URL = os.getenv("BINANCE_API_URL", "").strip()
+_EVENT_QUEUE_CAPACITY = 1024
+_BINANCE_RECV_WINDOW_MS = int(os.getenv("BINANCE_RECV_WINDOW_MS", "5000"))
+_BALANCE_POLL_SECONDS = float(os.getenv("BINANCE_BALANCE_POLL_SECONDS", "10"))
+_BALANCE_MAX_AGE_SECONDS = _BALANCE_POLL_SECONDS * 2
+_STATUS_FLUSH_SECONDS = 1.0
+_FOLLOW_WORKERS = int(
+    os.getenv("BINANCE_FOLLOW_WORKERS", str(min(16, (os.cpu_count() or 1) * 2)))
+)
+_DRAIN_BATCH = 64
+_COALESCE_MAX_EVENTS = int(os.getenv("BINANCE_COALESCE_MAX_EVENTS", "16"))
+_COALESCE_EVENT_TYPES = frozenset({"opened", "reduced"})
+_REDUCE_EVENT_TYPES = frozenset({"reduced", "closed"})
+_FOLLOW_MODES = frozenset({"fixed", "percentage"})
+_EXCHANGE_INFO_REFRESH_SECONDS = 600.0
+# Hyperliquid fill sides: B = bid (buy), A = ask (sell).
+_SIDE_HINT = {"B": "BUY", "b": "BUY", "A": "SELL", "a": "SELL"}
+
+# One connection pool for every follower's client so keep-alive connections to
+# the Binance API are reused across users instead of one pool per client.
+# Only idempotent reads are retried; orders must never be resubmitted blindly.
+_BINANCE_ADAPTER = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=32,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=(429, 502, 503, 504),
+        allowed_methods=frozenset({"GET"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    ),
+)
 
 
 def _float_or_zero(value: Any) -> float:
+    # float() accepts numbers and numeric strings directly.
+    if value is None:
+        return 0.0
     try:
-        if value is None:
-            return 0.0
-        if isinstance(value, (int, float)):
-            return float(value)
-        return float(str(value))
-    except Exception:
+        return float(value)
+    except (TypeError, ValueError, OverflowError):
         return 0.0
 
 
-@dataclass
+class _BalanceCache:
+    """Latest totalWalletBalance per API key, filled by the registry poller."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[float, float]] = {}
+
+    def get(self, key: Optional[str], max_age: float) -> Optional[float]:
+        if not key:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        balance, fetched_at = entry
+        if time.monotonic() - fetched_at > max_age:
+            return None
+        return balance
+
+    def put(self, key: Optional[str], balance: float) -> None:
+        if not key:
+            return
+        with self._lock:
+            self._entries[key] = (balance, time.monotonic())
+
+
+_balance_cache = _BalanceCache()
+
+
+class _StatusBuffer:
+    """Write-back buffer for follower status changes.
+
+    Updates for the same user are merged and written in one transaction every
+    _STATUS_FLUSH_SECONDS, so bursts of transitions (startup, repeated client
+    failures) cost a single commit.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def update(self, user_id: int, **fields: Any) -> None:
+        fields = {key: value for key, value in fields.items() if value is not None}
+        if not fields:
+            return
+        with self._lock:
+            self._pending.setdefault(user_id, {}).update(fields)
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name="binance-follow-status",
+                    daemon=True,
+                )
+                self._thread.start()
+
+    def discard(self, user_id: int) -> None:
+        """Drop pending changes that a freshly saved config supersedes."""
+        with self._lock:
+            self._pending.pop(user_id, None)
+
+    def flush(self) -> None:
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+        if not pending:
+            return
+        try:
+            bulk_update_binance_follow_status(pending)
+        except Exception as exc:  # pragma: no cover - defensive
+            logger.error("写入 Binance 跟单状态失败: %s", exc)
+
+    def close(self) -> None:
+        self._stop.set()
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stop.wait(_STATUS_FLUSH_SECONDS):
+            self.flush()
+
+
+_status_buffer = _StatusBuffer()
+atexit.register(_status_buffer.flush)
+
+
+class _SymbolFilters:
+    """Market order step size / min quantity per symbol from exchangeInfo.
+
+    exchangeInfo is public and identical for every account, so one cache is
+    shared by all followers and refreshed at most every
+    _EXCHANGE_INFO_REFRESH_SECONDS (e.g. when a newly listed symbol shows up).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[Decimal, Decimal]] = {}
+        # -inf so the first lookup always loads, even when monotonic() is
+        # still below the refresh interval (fresh container/VM).
+        self._loaded_at = float("-inf")
+
+    def get(self, client: Any, symbol: str) -> Optional[Tuple[Decimal, Decimal]]:
+        entry = self._entries.get(symbol)
+        if entry is not None:
+            return entry
+        with self._lock:
+            entry = self._entries.get(symbol)
+            if entry is None and time.monotonic() - self._loaded_at >= _EXCHANGE_INFO_REFRESH_SECONDS:
+                self._loaded_at = time.monotonic()
+                self._refresh(client)
+                entry = self._entries.get(symbol)
+        return entry
+
+    def _refresh(self, client: Any) -> None:
+        try:
+            info = client.exchange_info()
+        except Exception as exc:  # pragma: no cover - external API
+            logger.warning("获取 Binance 交易规则失败: %s", exc)
+            return
+        entries: Dict[str, Tuple[Decimal, Decimal]] = {}
+        for item in info.get("symbols") or []:
+            filters = {f.get("filterType"): f for f in item.get("filters") or []}
+            lot = filters.get("MARKET_LOT_SIZE") or filters.get("LOT_SIZE")
+            if not lot:
+                continue
+            try:
+                step = Decimal(str(lot.get("stepSize")))
+                min_qty = Decimal(str(lot.get("minQty") or "0"))
+            except ArithmeticError:
+                continue
+            if step > 0:
+                entries[item.get("symbol")] = (step, min_qty)
+        if entries:
+            self._entries = entries
+
+
+_symbol_filters = _SymbolFilters()
+
+
+def _coalesce_key(event: Dict[str, Any]) -> Optional[Tuple[Any, ...]]:
+    event_type = event.get("event_type")
+    if event_type not in _COALESCE_EVENT_TYPES:
+        return None
+    trade_details = event.get("trade_details") or {}
+    return (
+        event.get("address_lc"),
+        event.get("coin"),
+        event_type,
+        trade_details.get("side"),
+        trade_details.get("leverage"),
+        _float_or_zero(trade_details.get("size")) > 0,
+    )
+
+
+@lru_cache(maxsize=512)
+def _symbol_for_coin(coin: Any) -> Optional[str]:
+    coin_str = str(coin).upper().replace("PERP", "").strip()
+    if not coin_str:
+        return None
+    if coin_str.endswith("USDT"):
+        return coin_str
+    return f"{coin_str}USDT"
+
+
+def _balance_key(api_key: Optional[str]) -> Optional[str]:
+    if not api_key:
+        return None
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+# Mutable on purpose: each instance is owned by a single follower, which updates
+# it in place on state transitions instead of rebuilding it.
+@dataclass(slots=True)
 class FollowSettings:
     user_id: int
     enabled: bool
@@ -62,20 +282,26 @@ class FollowSettings:
 
 
 class BinanceFollower:
-    def __init__(self, user_id: int) -> None:
+    def __init__(self, user_id: int, submit: Callable[[Callable[[], None]], Any]) -> None:
         self.user_id = user_id
         self._config: Optional[FollowSettings] = None
-        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=1024)
-        self._thread: Optional[threading.Thread] = None
-        self._stop_event = threading.Event()
+        self._submit = submit
+        # Events are drained on the registry's shared pool by at most one task
+        # at a time (guarded by _scheduled), which keeps per-user ordering.
+        self._queue: "deque[Dict[str, Any]]" = deque()
+        self._schedule_lock = threading.Lock()
+        self._scheduled = False
+        self._active = False
+        self._stop_loss_due = False
         self._client: Optional[Any] = None
-        self._last_stop_loss_check = 0.0
+        self._balance_key: Optional[str] = None
 
     # Public API -----------------------------------------------------------
 
     def apply_config(self, config: FollowSettings) -> None:
         previous = self._config
         self._config = config
+        self._balance_key = _balance_key(config.api_key)
 
         if not config.enabled:
             self.stop()
@@ -84,7 +310,7 @@ class BinanceFollower:
         if not config.api_key or not config.api_secret:
             logger.warning("User %s 启用了跟单但未提供 Binance API 密钥，已忽略。", self.user_id)
             self.stop()
-            update_binance_follow_status(
+            _status_buffer.update(
                 self.user_id,
                 enabled=False,
                 status="disabled",
@@ -92,71 +318,127 @@ class BinanceFollower:
             )
             return
 
-        if self._thread is None or not self._thread.is_alive():
-            self._stop_event.clear()
-            self._thread = threading.Thread(
-                target=self._run,
-                name=f"binance-follow-{self.user_id}",
-                daemon=True,
-            )
-            self._thread.start()
-            logger.info("启动用户 %s 的 Binance 跟单线程。", self.user_id)
+        if not self._active:
+            self._active = True
+            logger.info("启动用户 %s 的 Binance 跟单。", self.user_id)
         elif previous and previous.mode != config.mode:
             logger.info("用户 %s 跟单模式变更为 %s。", self.user_id, config.mode)
 
     def enqueue_event(self, event: Dict[str, Any]) -> None:
-        if not self._config or not self._config.enabled:
+        if not self._active or not self._config or not self._config.enabled:
             return
-        try:
-            self._queue.put_nowait(event)
-        except queue.Full:
+        if len(self._queue) >= _EVENT_QUEUE_CAPACITY:
             logger.warning("用户 %s 的跟单事件队列已满，丢弃最新事件。", self.user_id)
+            return
+        self._queue.append(event)
+        self._schedule()
+
+    def request_stop_loss_check(self) -> None:
+        if not self._active:
+            return
+        self._stop_loss_due = True
+        self._schedule()
 
     def stop(self) -> None:
-        if self._thread and self._thread.is_alive():
-            self._stop_event.set()
-            try:
-                self._queue.put_nowait(None)
-            except queue.Full:
-                pass
-            self._thread.join(timeout=5)
-        self._thread = None
+        if self._active:
+            logger.info("用户 %s 的 Binance 跟单已停止。", self.user_id)
+        self._active = False
+        self._queue.clear()
         self._client = None
 
     # Internal -------------------------------------------------------------
 
-    def _run(self) -> None:
-        while not self._stop_event.is_set():
+    def _schedule(self) -> None:
+        with self._schedule_lock:
+            if self._scheduled:
+                return
+            self._scheduled = True
+        try:
+            self._submit(self._drain)
+        except RuntimeError:  # pool already shut down
+            with self._schedule_lock:
+                self._scheduled = False
+
+    def _drain(self) -> None:
+        processed = 0
+        while True:
+            while self._active and processed < _DRAIN_BATCH:
+                if self._stop_loss_due:
+                    self._stop_loss_due = False
+                    self._check_stop_loss()
+                    continue
+                try:
+                    event = self._queue.popleft()
+                except IndexError:
+                    break
+                processed += 1
+                try:
+                    self._process_event(self._coalesce(event))
+                except Exception as exc:  # pragma: no cover - defensive
+                    logger.exception("处理用户 %s Binance 跟单事件失败: %s", self.user_id, exc)
+
+            if processed >= _DRAIN_BATCH and self._active and self._queue:
+                # Yield the worker to other users, keeping our slot scheduled.
+                try:
+                    self._submit(self._drain)
+                    return
+                except RuntimeError:
+                    pass
+            with self._schedule_lock:
+                if not self._active or not (self._queue or self._stop_loss_due):
+                    self._scheduled = False
+                    return
+            processed = 0
+
+    def _coalesce(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        """Fold queued events that continue the same fill burst into ``event``.
+
+        Only events already waiting right behind ``event`` are merged (no extra
+        delay is introduced). Sizes are summed when the fills carry one;
+        otherwise the first previous_position and last current_position are
+        kept, so the position delta covers the whole burst. Fixed mode sends
+        one fixed-size order per event, so its events are never merged.
+        """
+        config = self._config
+        if not config or config.mode != "percentage":
+            return event
+        key = _coalesce_key(event)
+        if key is None:
+            return event
+        merged: Optional[Dict[str, Any]] = None
+        size = 0.0
+        for _ in range(_COALESCE_MAX_EVENTS - 1):
             try:
-                event = self._queue.get(timeout=1.0)
-            except queue.Empty:
-                self._periodic_stop_loss_check()
-                continue
-
-            if event is None:
+                nxt = self._queue[0]
+            except IndexError:
+                break
+            if _coalesce_key(nxt) != key:
                 break
-
             try:
-                self._process_event(event)
-            except Exception as exc:  # pragma: no cover - defensive
-                logger.exception("处理用户 %s Binance 跟单事件失败: %s", self.user_id, exc)
-
-        logger.info("用户 %s 的 Binance 跟单线程结束。", self.user_id)
-
-    def _periodic_stop_loss_check(self) -> None:
-        now = time.time()
-        if now - self._last_stop_loss_check < 10:
-            return
-        self._last_stop_loss_check = now
-        self._check_stop_loss()
+                self._queue.popleft()
+            except IndexError:
+                break
+            if merged is None:
+                merged = dict(event)
+                merged["trade_details"] = dict(event.get("trade_details") or {})
+                size = _float_or_zero(merged["trade_details"].get("size"))
+            if key[-1]:
+                size += _float_or_zero((nxt.get("trade_details") or {}).get("size"))
+            merged["current_position"] = nxt.get("current_position")
+        if merged is None:
+            return event
+        if key[-1]:
+            merged["trade_details"]["size"] = size
+        return merged
 
     def _process_event(self, event: Dict[str, Any]) -> None:
         config = self._config
         if not config or not config.enabled:
             return
 
-        address = (event.get("address") or "").lower()
-        if config.wallet_address and address != config.wallet_address.lower():
+        # wallet_address is lowercased in _settings_from_dict and address_lc by
+        # the registry when the event is dispatched.
+        if config.wallet_address and event.get("address_lc") != config.wallet_address:
             return
 
         if self._check_stop_loss():
@@ -208,7 +490,7 @@ class BinanceFollower:
         if not self._check_max_position(client, symbol, quantity, event_type):
             return
 
-        reduce_only = event_type in {"reduced", "closed"}
+        reduce_only = event_type in _REDUCE_EVENT_TYPES
         self._place_market_order(client, symbol, side, quantity, reduce_only)
         self._check_stop_loss()
 
@@ -220,45 +502,45 @@ class BinanceFollower:
         config = self._config
         if not config:
             return None
-        try:
-            module = importlib.import_module("binance.um_futures")
-        except ModuleNotFoundError:
+        if _UMFutures is None and not _UMFUTURES_INCOMPATIBLE:
             logger.error(
                 "未找到 binance-connector，请执行 `pip install binance-connector` 后重启服务。"
             )
-            update_binance_follow_status(
+            _status_buffer.update(
                 self.user_id,
                 enabled=False,
                 status="disabled",
                 stop_reason="缺少 binance-connector 包",
             )
-            self._config = replace(config, enabled=False)
+            config.enabled = False
             return None
 
-        UMFutures = getattr(module, "UMFutures", None)
-        if UMFutures is None:
+        if _UMFutures is None:
             logger.error("binance-connector 缺少 UMFutures 类，请检查依赖版本。")
-            update_binance_follow_status(
+            _status_buffer.update(
                 self.user_id,
                 enabled=False,
                 status="disabled",
                 stop_reason="binance-connector 版本不兼容",
             )
-            self._config = replace(config, enabled=False)
+            config.enabled = False
             return None
 
         try:
-            self._client = UMFutures(
+            self._client = _UMFutures(
                 key=config.api_key,
                 secret=config.api_secret,
                 base_url=_BINANCE_API_URL or None,
             )
+            session = getattr(self._client, "session", None)
+            if session is not None:
+                session.mount("https://", _BINANCE_ADAPTER)
             if config.baseline_balance is None:
                 balance = self._fetch_total_wallet_balance(self._client)
                 if balance is not None:
-                    config = replace(config, baseline_balance=balance)
-                    self._config = config
-                    update_binance_follow_status(
+                    _balance_cache.put(self._balance_key, balance)
+                    config.baseline_balance = balance
+                    _status_buffer.update(
                         self.user_id,
                         baseline_balance=balance,
                         status="active",
@@ -267,19 +549,19 @@ class BinanceFollower:
                     )
         except Exception as exc:  # pragma: no cover - network / credential
             logger.error("初始化用户 %s 的 Binance 客户端失败: %s", self.user_id, exc)
-            update_binance_follow_status(
+            _status_buffer.update(
                 self.user_id,
                 enabled=False,
                 status="disabled",
                 stop_reason="Binance API 初始化失败",
             )
-            self._config = replace(config, enabled=False)
+            config.enabled = False
             return None
         return self._client
 
     def _fetch_total_wallet_balance(self, client: Any) -> Optional[float]:
         try:
-            account = client.account()
+            account = client.account(recvWindow=_BINANCE_RECV_WINDOW_MS)
             balance = account.get("totalWalletBalance")
             return _float_or_zero(balance)
         except ClientError as exc:  # pragma: no cover - external API
@@ -325,7 +607,9 @@ class BinanceFollower:
             return False
         if config.baseline_balance is None:
             return False
-        current_balance = self._fetch_total_wallet_balance(client)
+        # Balances are refreshed by the registry's shared poller; a stale or
+        # missing entry just defers the check to the next event/tick.
+        current_balance = _balance_cache.get(self._balance_key, _BALANCE_MAX_AGE_SECONDS)
         if current_balance is None:
             return False
         loss = config.baseline_balance - current_balance
@@ -336,13 +620,14 @@ class BinanceFollower:
                 loss,
                 config.stop_loss_amount,
             )
-            update_binance_follow_status(
+            _status_buffer.update(
                 self.user_id,
                 enabled=False,
                 status="stopped_by_loss",
                 stop_reason=f"亏损 {loss:.2f} ≥ 阈值 {config.stop_loss_amount:.2f}",
             )
-            self._config = replace(config, enabled=False, stop_reason="stop_loss_triggered")
+            config.enabled = False
+            config.stop_reason = "stop_loss_triggered"
             self.stop()
             return True
         return False
@@ -393,11 +678,9 @@ class BinanceFollower:
         return max(0.0, contracts)
 
     def _determine_side(self, event_type: str, trade_details: Dict[str, Any], event: Dict[str, Any]) -> Optional[str]:
-        side_hint = (trade_details.get("side") or "").upper()
-        if side_hint == "B":
-            return "BUY"
-        if side_hint == "A":
-            return "SELL"
+        side = _SIDE_HINT.get(trade_details.get("side"))
+        if side:
+            return side
 
         if event_type == "opened":
             current_position = event.get("current_position") or {}
@@ -406,7 +689,7 @@ class BinanceFollower:
 
         previous_position = event.get("previous_position") or {}
         size = _float_or_zero(previous_position.get("szi"))
-        if event_type in {"reduced", "closed"}:
+        if event_type in _REDUCE_EVENT_TYPES:
             return "SELL" if size > 0 else "BUY"
         return None
 
@@ -414,7 +697,7 @@ class BinanceFollower:
         config = self._config
         if not config or not config.max_position or config.max_position <= 0:
             return True
-        if event_type in {"reduced", "closed"}:
+        if event_type in _REDUCE_EVENT_TYPES:
             return True
         try:
             positions = client.position_risk(symbol=symbol)
@@ -452,7 +735,24 @@ class BinanceFollower:
         quantity: float,
         reduce_only: bool,
     ) -> None:
-        qty_formatted = f"{quantity:.8f}".rstrip("0").rstrip(".")
+        filters = _symbol_filters.get(client, symbol)
+        if filters is None:
+            qty_formatted = f"{quantity:.8f}".rstrip("0").rstrip(".")
+        else:
+            # Round down to the symbol's step so Binance doesn't reject the
+            # order for precision (and we never exceed the computed size).
+            step, min_qty = filters
+            quantized = (Decimal(repr(quantity)) / step).to_integral_value(ROUND_DOWN) * step
+            if quantized <= 0 or quantized < min_qty:
+                logger.info(
+                    "用户 %s %s 下单量 %.8f 低于 Binance 最小数量 %s，已跳过。",
+                    self.user_id,
+                    symbol,
+                    quantity,
+                    min_qty,
+                )
+                return
+            qty_formatted = format(quantized, "f")
         params = {
             "symbol": symbol,
             "side": side,
@@ -478,42 +778,103 @@ class BinanceFollower:
     def _map_symbol(self, coin: Any) -> Optional[str]:
         if not coin:
             return None
-        coin_str = str(coin).upper().replace("PERP", "").strip()
-        if not coin_str:
-            return None
-        if coin_str.endswith("USDT"):
-            return coin_str
-        return f"{coin_str}USDT"
+        # The set of coins is small and shared by all followers.
+        return _symbol_for_coin(coin)
 
 
 class BinanceFollowRegistry:
     def __init__(self) -> None:
+        # Writers (configure/shutdown) are rare and serialise on _lock, building
+        # a new dict and rebinding it; readers (every dispatched event, the
+        # poller) just read the current snapshot without locking.
         self._lock = threading.Lock()
         self._followers: Dict[int, BinanceFollower] = {}
+        self._poller: Optional[threading.Thread] = None
+        self._poller_stop = threading.Event()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def _submit(self, task: Callable[[], None]) -> Any:
+        executor = self._executor
+        if executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=_FOLLOW_WORKERS,
+                        thread_name_prefix="binance-follow",
+                    )
+                executor = self._executor
+        return executor.submit(task)
 
     def configure_user(self, settings: FollowSettings) -> None:
         with self._lock:
             follower = self._followers.get(settings.user_id)
             if follower is None:
-                follower = BinanceFollower(settings.user_id)
-                self._followers[settings.user_id] = follower
+                follower = BinanceFollower(settings.user_id, self._submit)
             follower.apply_config(settings)
+            followers = dict(self._followers)
             if not settings.enabled:
                 follower.stop()
-                self._followers.pop(settings.user_id, None)
+                followers.pop(settings.user_id, None)
+                self._followers = followers
+                return
+            followers[settings.user_id] = follower
+            self._followers = followers
+            if self._poller is None or not self._poller.is_alive():
+                self._poller_stop.clear()
+                self._poller = threading.Thread(
+                    target=self._poll_balances,
+                    name="binance-follow-balance",
+                    daemon=True,
+                )
+                self._poller.start()
 
     def handle_event(self, user_id: int, event: Dict[str, Any]) -> None:
-        with self._lock:
-            follower = self._followers.get(user_id)
+        follower = self._followers.get(user_id)
         if follower:
+            event["address_lc"] = (event.get("address") or "").lower()
             follower.enqueue_event(event)
 
     def shutdown(self) -> None:
+        self._poller_stop.set()
         with self._lock:
             followers = list(self._followers.values())
-            self._followers.clear()
+            self._followers = {}
         for follower in followers:
             follower.stop()
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _poll_balances(self) -> None:
+        """Fetch each distinct account's balance once per interval for all followers.
+
+        This is also the single stop-loss clock for every follower. Ticks are
+        scheduled on a monotonic deadline so slow balance requests don't
+        stretch the interval.
+        """
+        next_tick = time.monotonic() + _BALANCE_POLL_SECONDS
+        while not self._poller_stop.wait(max(0.0, next_tick - time.monotonic())):
+            now = time.monotonic()
+            next_tick += _BALANCE_POLL_SECONDS
+            if next_tick <= now:
+                next_tick = now + _BALANCE_POLL_SECONDS
+            followers = list(self._followers.values())
+            if not followers:
+                continue
+            polled = set()
+            for follower in followers:
+                key = follower._balance_key
+                client = follower._client
+                if not key or client is None or key in polled:
+                    continue
+                polled.add(key)
+                balance = follower._fetch_total_wallet_balance(client)
+                if balance is not None:
+                    _balance_cache.put(key, balance)
+            for follower in followers:
+                follower.request_stop_loss_check()
 
 
 _registry = BinanceFollowRegistry()
@@ -521,7 +882,7 @@ _registry = BinanceFollowRegistry()
 
 def _settings_from_dict(user_id: int, payload: Dict[str, Any]) -> FollowSettings:
     mode = (payload.get("mode") or "fixed").lower()
-    if mode not in {"fixed", "percentage"}:
+    if mode not in _FOLLOW_MODES:
         mode = "fixed"
     return FollowSettings(
         user_id=user_id,
@@ -541,17 +902,23 @@ def _settings_from_dict(user_id: int, payload: Dict[str, Any]) -> FollowSettings
 
 
 def configure_user_follow(user_id: int, config: Optional[Dict[str, Any]] = None) -> None:
+    _status_buffer.discard(user_id)
     payload = config or get_binance_follow_config(user_id)
     settings = _settings_from_dict(user_id, payload)
     _registry.configure_user(settings)
 
 
 def initialise_followers_from_db() -> None:
-    for user in list_users():
-        user_id = user.get("id")
+    # Disabled configs would only create and immediately drop a follower, so
+    # load just the enabled ones in a single query.
+    for config in list_binance_follow_configs(enabled_only=True):
+        user_id = config.get("user_id")
         if not user_id:
             continue
-        configure_user_follow(user_id)
+        _registry.configure_user(_settings_from_dict(user_id, config))
+    # Write whatever the bootstrap changed (e.g. followers disabled for missing
+    # keys) now, in one transaction, rather than waiting for the next tick.
+    _status_buffer.flush()
 
 
 def dispatch_trade_event(user_id: int, event: Dict[str, Any]) -> None:
@@ -559,4 +926,5 @@ def dispatch_trade_event(user_id: int, event: Dict[str, Any]) -> None:
 
 
 def shutdown_followers() -> None:
-    _registry.shutdown()
\ No newline at end of file
+    _registry.shutdown()
+    _status_buffer.close()
\ No newline at end of file
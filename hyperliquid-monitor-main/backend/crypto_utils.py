@@ -2,6 +2,7 @@ import base64
 import hashlib
 import logging
 import os
+from functools import lru_cache
 from typing import Optional
 
 from cryptography.fernet import Fernet, InvalidToken
@@ -11,10 +12,14 @@ logger = logging.getLogger(__name__)
 _FERNET_INSTANCE: Optional[Fernet] = None
 
 
-def _get_fernet() -> Fernet:
-    global _FERNET_INSTANCE
-    if _FERNET_INSTANCE is not None:
-        return _FERNET_INSTANCE
+def _build_fernet() -> Fernet:
+    # A ready-made Fernet key (urlsafe base64 of 32 bytes) skips all derivation.
+    prepared = os.getenv("BINANCE_ENCRYPTION_KEY_B64", "").strip()
+    if prepared:
+        try:
+            return Fernet(prepared.encode("utf-8"))
+        except Exception as exc:  # pragma: no cover - defensive branch
+            raise RuntimeError("BINANCE_ENCRYPTION_KEY_B64 格式错误，无法初始化加密器。") from exc
 
     secret = os.getenv("BINANCE_ENCRYPTION_KEY", "").strip()
     if not secret:
@@ -24,28 +29,46 @@ def _get_fernet() -> Fernet:
 
     try:
         if len(secret) == 44:
+            # Fernet() validates the key itself; no need to decode it first.
             key_bytes = secret.encode("utf-8")
-            base64.urlsafe_b64decode(key_bytes)
         else:
             digest = hashlib.sha256(secret.encode("utf-8")).digest()
             key_bytes = base64.urlsafe_b64encode(digest)
-        fernet = Fernet(key_bytes)
+        return Fernet(key_bytes)
     except Exception as exc:  # pragma: no cover - defensive branch
         raise RuntimeError("BINANCE_ENCRYPTION_KEY 格式错误，无法初始化加密器。") from exc
 
+
+def _get_fernet() -> Fernet:
+    global _FERNET_INSTANCE, _encrypt, _decrypt
+    if _FERNET_INSTANCE is not None:
+        return _FERNET_INSTANCE
+    fernet = _build_fernet()
     _FERNET_INSTANCE = fernet
+    _encrypt = fernet.encrypt
+    _decrypt = fernet.decrypt
+    _decrypt_cached.cache_clear()
     return fernet
 
 
+# Until the key is available (the .env file may be loaded after this module is
+# imported) these resolve the Fernet lazily; afterwards they are rebound to the
+# instance's bound methods so the hot path is a single call.
+def _encrypt(data: bytes) -> bytes:
+    return _get_fernet().encrypt(data)
+
+
+def _decrypt(token: bytes) -> bytes:
+    return _get_fernet().decrypt(token)
+
+
 def encrypt_value(raw: Optional[str]) -> Optional[str]:
     if raw is None:
         return None
     raw = raw.strip()
     if not raw:
         return None
-    fernet = _get_fernet()
-    token = fernet.encrypt(raw.encode("utf-8"))
-    return token.decode("utf-8")
+    return _encrypt(raw.encode("utf-8")).decode("utf-8")
 
 
 def decrypt_value(token: Optional[str]) -> Optional[str]:
@@ -54,11 +77,23 @@ def decrypt_value(token: Optional[str]) -> Optional[str]:
     token = token.strip()
     if not token:
         return None
-    fernet = _get_fernet()
+    return _decrypt_cached(token)
+
+
+# Fernet tokens are content-addressed (a token only ever decrypts to one
+# plaintext under a given key), so reloading the same stored credentials on
+# every follower reconfigure can skip the HMAC check and AES decrypt.
+@lru_cache(maxsize=1024)
+def _decrypt_cached(token: str) -> Optional[str]:
     try:
-        value = fernet.decrypt(token.encode("utf-8"))
-        return value.decode("utf-8")
+        return _decrypt(token.encode("utf-8")).decode("utf-8")
     except InvalidToken:
         logger.error("解密 Binance 密钥失败：密文无效或密钥已变更。")
         return None
 
+
+if os.getenv("BINANCE_ENCRYPTION_KEY_B64", "").strip() or os.getenv("BINANCE_ENCRYPTION_KEY", "").strip():
+    try:
+        _get_fernet()
+    except RuntimeError as exc:
+        logger.error("%s", exc)
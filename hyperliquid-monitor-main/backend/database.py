@@ -1,19 +1,68 @@
+import atexit
 import json
+import re
 import sqlite3
+import threading
 from contextlib import contextmanager
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+
+try:  # pragma: no cover - optional dependency
+    import orjson
+except ImportError:  # pragma: no cover - fall back to stdlib json
+    orjson = None
 
 from .crypto_utils import decrypt_value, encrypt_value
 
 DB_PATH = Path(__file__).resolve().parent / "data.db"
-
-
-def init_db() -> None:
-    DB_PATH.parent.mkdir(exist_ok=True)
-    with sqlite3.connect(DB_PATH) as conn:
-        conn.execute(
+_UTC = timezone.utc
+
+
+def _now_iso() -> str:
+    return datetime.now(_UTC).isoformat()
+
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers can keep
+# catching the stdlib exception either way.
+if orjson is not None:
+    def _json_loads(raw: str) -> Any:
+        return orjson.loads(raw)
+
+    def _json_dumps(value: Any) -> str:
+        return orjson.dumps(value).decode("utf-8")
+else:  # pragma: no cover - stdlib fallback
+    _json_loads = json.loads
+    _json_dumps = json.dumps
+
+
+# Columns user_configs gained before the schema was versioned. A version-0
+# file may predate any of them, so that one upgrade still checks table_info.
+_LEGACY_USER_CONFIG_COLUMNS = {
+    "language": "TEXT DEFAULT 'zh'",
+    "binance_follow_enabled": "INTEGER DEFAULT 0",
+    "binance_wallet_address": "TEXT",
+    "binance_mode": "TEXT",
+    "binance_amount": "REAL",
+    "binance_stop_loss_amount": "REAL",
+    "binance_max_position": "REAL",
+    "binance_min_order_size": "REAL",
+    "binance_api_key": "TEXT",
+    "binance_api_secret": "TEXT",
+    "binance_baseline_balance": "REAL",
+    "binance_follow_status": "TEXT DEFAULT 'disabled'",
+    "binance_follow_stop_reason": "TEXT",
+    "wecom_enabled": "INTEGER DEFAULT 0",
+    "wecom_webhook_url": "TEXT",
+    "wecom_mentions": "TEXT",
+}
+
+# (user_version, DDL) in ascending order. init_db() runs only the entries newer
+# than the file's user_version; append a new entry for every schema change.
+_MIGRATIONS: List[Tuple[int, List[str]]] = [
+    (
+        1,
+        [
             """
             CREATE TABLE IF NOT EXISTS users (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -25,9 +74,7 @@ def init_db() -> None:
                 last_payment_hash TEXT,
                 last_reminder_at TEXT
             )
-            """
-        )
-        conn.execute(
+            """,
             """
             CREATE TABLE IF NOT EXISTS user_configs (
                 user_id INTEGER PRIMARY KEY,
@@ -53,59 +100,233 @@ def init_db() -> None:
                 wecom_mentions TEXT,
                 FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
             )
-            """
-        )
-        conn.execute(
+            """,
             """
             CREATE TABLE IF NOT EXISTS email_verifications (
                 email TEXT PRIMARY KEY,
                 code TEXT NOT NULL,
                 expires_at TEXT NOT NULL
             )
-            """
-        )
-        # Ensure newer columns exist for legacy databases
-        cursor = conn.execute("PRAGMA table_info(user_configs)")
-        existing_columns = {row[1] for row in cursor.fetchall()}
-        required_columns = {
-            "language": "TEXT DEFAULT 'zh'",
-            "binance_follow_enabled": "INTEGER DEFAULT 0",
-            "binance_wallet_address": "TEXT",
-            "binance_mode": "TEXT",
-            "binance_amount": "REAL",
-            "binance_stop_loss_amount": "REAL",
-            "binance_max_position": "REAL",
-            "binance_min_order_size": "REAL",
-            "binance_api_key": "TEXT",
-            "binance_api_secret": "TEXT",
-            "binance_baseline_balance": "REAL",
-            "binance_follow_status": "TEXT DEFAULT 'disabled'",
-            "binance_follow_stop_reason": "TEXT",
-            "wecom_enabled": "INTEGER DEFAULT 0",
-            "wecom_webhook_url": "TEXT",
-            "wecom_mentions": "TEXT",
-        }
-        for column, ddl in required_columns.items():
-            if column not in existing_columns:
-                conn.execute(f"ALTER TABLE user_configs ADD COLUMN {column} {ddl}")
+            """,
+        ],
+    ),
+    (
+        2,
+        [
+            # Lookups by payment hash (duplicate-payment check), the reminder
+            # scan over subscription_end, and the enabled-followers startup
+            # query. Partial: most users never paid, and "= ?" implies NOT NULL
+            # so the planner still uses it.
+            "CREATE INDEX IF NOT EXISTS idx_users_last_payment_hash ON users(last_payment_hash) "
+            "WHERE last_payment_hash IS NOT NULL",
+            "CREATE INDEX IF NOT EXISTS idx_users_subscription_end ON users(subscription_end)",
+            "CREATE INDEX IF NOT EXISTS idx_user_configs_binance_enabled "
+            "ON user_configs(user_id) WHERE binance_follow_enabled = 1",
+        ],
+    ),
+    # Data-only: _split_legacy_wallets() rewrites old wallet rows.
+    (3, []),
+]
+_SCHEMA_VERSION = _MIGRATIONS[-1][0]
+
+
+def _add_legacy_columns(conn: sqlite3.Connection) -> None:
+    existing_columns = {row[1] for row in conn.execute("PRAGMA table_info(user_configs)")}
+    for column, ddl in _LEGACY_USER_CONFIG_COLUMNS.items():
+        if column not in existing_columns:
+            conn.execute(f"ALTER TABLE user_configs ADD COLUMN {column} {ddl}")
+
+
+_ADDR_SPLIT = re.compile(r"[\s,;]+")
+
+
+def _split_legacy_wallets(conn: sqlite3.Connection) -> None:
+    # Rows saved before the API split its input can hold several addresses in
+    # one entry ("0xa 0xb", "0xa;0xb") or plain comma text; store one address
+    # per entry so readers never have to split again.
+    rows = conn.execute(
+        "SELECT user_id, wallet_addresses FROM user_configs WHERE wallet_addresses IS NOT NULL"
+    ).fetchall()
+    for user_id, raw in rows:
+        try:
+            entries = _json_loads(raw)
+        except json.JSONDecodeError:
+            entries = [raw]
+        if isinstance(entries, str):
+            entries = [entries]
+        elif not isinstance(entries, list):
+            entries = []
+        wallets = [
+            token
+            for entry in entries
+            if isinstance(entry, str)
+            for token in _ADDR_SPLIT.split(entry.strip())
+            if token
+        ]
+        if wallets != entries:
+            conn.execute(
+                "UPDATE user_configs SET wallet_addresses = ? WHERE user_id = ?",
+                (_json_dumps(wallets), user_id),
+            )
+
+
+def init_db() -> None:
+    DB_PATH.parent.mkdir(exist_ok=True)
+    with sqlite3.connect(DB_PATH) as conn:
+        # WAL is persistent in the database file, so readers never block the
+        # writer for every later connection too.
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        pending = [(target, statements) for target, statements in _MIGRATIONS if target > version]
+        if not pending:
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        for target, statements in pending:
+            for statement in statements:
+                conn.execute(statement)
+            if target == 1:
+                # CREATE TABLE IF NOT EXISTS leaves a pre-versioning table as
+                # it was; bring its columns up to date before anything indexes
+                # them.
+                _add_legacy_columns(conn)
+            elif target == 3:
+                _split_legacy_wallets(conn)
+        conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
         conn.commit()
+        # Give the planner statistics for the indexes above.
+        conn.execute("ANALYZE")
+
+
+_thread_local = threading.local()
+_connections: Dict[int, sqlite3.Connection] = {}
+_connections_lock = threading.Lock()
+
+
+def _open_connection() -> sqlite3.Connection:
+    # sqlite3 keeps prepared statements per connection keyed by SQL text; the
+    # dynamically built UPDATEs make the default 128 slots a bit tight.
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, cached_statements=256)
+    conn.row_factory = sqlite3.Row
+    # journal_mode is stored in the file by init_db(); the rest are
+    # per-connection and must be applied to every new connection.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-64000")
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA wal_autocheckpoint=1000")
+    return conn
+
+
+def _thread_connection() -> sqlite3.Connection:
+    conn = getattr(_thread_local, "conn", None)
+    if conn is not None:
+        return conn
+    conn = _open_connection()
+    _thread_local.conn = conn
+    with _connections_lock:
+        # Close connections left behind by threads that have since exited.
+        alive = {thread.ident for thread in threading.enumerate()}
+        for ident in [ident for ident in _connections if ident not in alive]:
+            _connections.pop(ident).close()
+        _connections[threading.get_ident()] = conn
+    return conn
+
+
+def _close_all_connections() -> None:
+    with _connections_lock:
+        connections = list(_connections.values())
+        _connections.clear()
+    for conn in connections:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+
+atexit.register(_close_all_connections)
 
 
 @contextmanager
 def get_db() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    """Yield this thread's long-lived connection.
+
+    Anything a caller leaves uncommitted is rolled back on exit, matching the
+    old connect/close behaviour. Nested uses (a helper called inside
+    transaction()) leave that to the outermost block.
+    """
+    conn = _thread_connection()
+    depth = getattr(_thread_local, "depth", 0)
+    _thread_local.depth = depth + 1
     try:
         yield conn
     finally:
-        conn.close()
+        _thread_local.depth = depth
+        if depth == 0 and conn.in_transaction:
+            conn.rollback()
 
 
-def create_user(email: str, password_hash: str, trial_days: int) -> Dict[str, Any]:
+@contextmanager
+def transaction() -> sqlite3.Connection:
+    """Run several writes as one unit: committed on exit, rolled back on error.
+
+    BEGIN IMMEDIATE takes the write lock up front so the block can't fail
+    half-way on SQLITE_BUSY. Write helpers called inside the block join it
+    instead of committing. A nested transaction() becomes a SAVEPOINT, so an
+    inner failure only undoes the inner writes and an inner exit never
+    commits the outer block.
+    """
+    with get_db() as conn:
+        tx_depth = getattr(_thread_local, "tx_depth", 0)
+        if tx_depth == 0:
+            if conn.in_transaction:
+                conn.commit()
+            conn.execute("BEGIN IMMEDIATE")
+        else:
+            savepoint = f"tx_{tx_depth}"
+            conn.execute(f"SAVEPOINT {savepoint}")
+        _thread_local.tx_depth = tx_depth + 1
+        try:
+            yield conn
+        except BaseException:
+            if tx_depth == 0:
+                conn.rollback()
+            else:
+                conn.execute(f"ROLLBACK TO {savepoint}")
+                conn.execute(f"RELEASE {savepoint}")
+            raise
+        else:
+            if tx_depth == 0:
+                conn.commit()
+            else:
+                conn.execute(f"RELEASE {savepoint}")
+        finally:
+            _thread_local.tx_depth = tx_depth
+
+
+@contextmanager
+def _writer() -> sqlite3.Connection:
+    # Inside an open transaction() the commit is left to that block;
+    # otherwise behave like a standalone write.
+    if getattr(_thread_local, "tx_depth", 0):
+        with get_db() as own:
+            yield own
+        return
+    with get_db() as own:
+        yield own
+        own.commit()
+
+
+def create_user(
+    email: str,
+    password_hash: str,
+    trial_days: int,
+) -> Dict[str, Any]:
     email = email.lower()
-    now = datetime.now(timezone.utc)
+    now = datetime.now(_UTC)
     trial_end = now + timedelta(days=trial_days)
-    with get_db() as conn:
+    with _writer() as conn:
         cursor = conn.execute(
             """
             INSERT INTO users (email, password_hash, created_at, trial_end)
@@ -113,7 +334,6 @@ def create_user(email: str, password_hash: str, trial_days: int) -> Dict[str, An
             """,
             (email, password_hash, now.isoformat(), trial_end.isoformat()),
         )
-        conn.commit()
         user_id = cursor.lastrowid
     return get_user_by_id(user_id)
 
@@ -125,6 +345,30 @@ def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
         return dict(row) if row else None
 
 
+def get_user_credentials(email: str) -> Optional[Dict[str, Any]]:
+    """Just what login needs: the hash to check plus the fields it returns."""
+    with get_db() as conn:
+        cursor = conn.execute(
+            "SELECT id, email, password_hash, trial_end, subscription_end FROM users WHERE email = ?",
+            (email.lower(),),
+        )
+        row = cursor.fetchone()
+        return dict(row) if row else None
+
+
+def email_registered(email: str) -> bool:
+    with get_db() as conn:
+        cursor = conn.execute("SELECT 1 FROM users WHERE email = ?", (email.lower(),))
+        return cursor.fetchone() is not None
+
+
+def get_user_id_by_payment_hash(tx_hash: str) -> Optional[int]:
+    with get_db() as conn:
+        cursor = conn.execute("SELECT id FROM users WHERE last_payment_hash = ?", (tx_hash.lower(),))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+
 def get_user_by_id(user_id: int) -> Optional[Dict[str, Any]]:
     with get_db() as conn:
         cursor = conn.execute("SELECT * FROM users WHERE id = ?", (user_id,))
@@ -146,51 +390,116 @@ def list_users() -> List[Dict[str, Any]]:
         return [dict(row) for row in rows]
 
 
+def list_users_due_for_reminder(now: str, upcoming_threshold: str, reminded_before: str) -> List[Dict[str, Any]]:
+    """Users whose subscription ends in (now, upcoming_threshold] and who were not reminded since reminded_before.
+
+    Timestamps are compared as the ISO-8601 UTC strings the users table stores.
+    """
+    with get_db() as conn:
+        cursor = conn.execute(
+            """
+            SELECT id, email, subscription_end, last_reminder_at
+            FROM users
+            WHERE subscription_end > ? AND subscription_end <= ?
+              AND (last_reminder_at IS NULL OR last_reminder_at < ?)
+            """,
+            (now, upcoming_threshold, reminded_before),
+        )
+        return [dict(row) for row in cursor.fetchall()]
+
+
 def get_user_config(user_id: int) -> Dict[str, Any]:
     with get_db() as conn:
         cursor = conn.execute("SELECT * FROM user_configs WHERE user_id = ?", (user_id,))
         row = cursor.fetchone()
-        if not row:
-            return {
-                "telegram_bot_token": None,
-                "telegram_chat_id": None,
-                "wallet_addresses": [],
-                "updated_at": None,
-                "language": "zh",
-                "wecom_enabled": False,
-                "wecom_webhook_url": None,
-                "wecom_mentions": [],
-            }
-        raw_wallets = row["wallet_addresses"] or "[]"
-        try:
-            wallets = json.loads(raw_wallets)
-            if not isinstance(wallets, list):
-                wallets = []
-        except json.JSONDecodeError:
-            wallets = [addr.strip() for addr in raw_wallets.split(",") if addr.strip()]
-        language = "zh"
-        if hasattr(row, "keys") and "language" in row.keys():
-            value = row["language"] or "zh"
-            language = value.lower() if isinstance(value, str) else "zh"
-            if language not in {"zh", "en"}:
-                language = "zh"
-        # 安全地访问可能不存在的列
-        row_keys = row.keys() if hasattr(row, "keys") else []
-        wecom_enabled = bool(row["wecom_enabled"]) if "wecom_enabled" in row_keys else False
-        wecom_webhook_url = row["wecom_webhook_url"] if "wecom_webhook_url" in row_keys else None
-        wecom_mentions_raw = row["wecom_mentions"] if "wecom_mentions" in row_keys else None
-        wecom_mentions = (wecom_mentions_raw.split(",") if wecom_mentions_raw else [])
-        
+    return _user_config_from_row(row)
+
+
+_USER_COLUMNS = (
+    "id",
+    "email",
+    "password_hash",
+    "created_at",
+    "trial_end",
+    "subscription_end",
+    "last_payment_hash",
+    "last_reminder_at",
+)
+
+
+def list_users_with_configs() -> List[Dict[str, Any]]:
+    """Every user with its monitor and WeCom config, in one query.
+
+    Each item is the users row plus ``config`` and ``wecom`` entries shaped
+    like get_user_config() and get_wecom_config() return them.
+    """
+    with get_db() as conn:
+        cursor = conn.execute(
+            """
+            SELECT u.*, c.*
+            FROM users u
+            LEFT JOIN user_configs c ON c.user_id = u.id
+            ORDER BY u.id
+            """
+        )
+        rows = cursor.fetchall()
+    results: List[Dict[str, Any]] = []
+    for row in rows:
+        user = {key: row[key] for key in _USER_COLUMNS}
+        config = _user_config_from_row(row if row["user_id"] is not None else None)
+        user["config"] = config
+        user["wecom"] = _wecom_from_config(config)
+        results.append(user)
+    return results
+
+
+def _user_config_from_row(row: Optional[sqlite3.Row]) -> Dict[str, Any]:
+    if not row:
         return {
-            "telegram_bot_token": row["telegram_bot_token"],
-            "telegram_chat_id": row["telegram_chat_id"],
-            "wallet_addresses": wallets,
-            "updated_at": row["updated_at"],
-            "language": language,
-            "wecom_enabled": wecom_enabled,
-            "wecom_webhook_url": wecom_webhook_url,
-            "wecom_mentions": wecom_mentions,
+            "telegram_bot_token": None,
+            "telegram_chat_id": None,
+            "wallet_addresses": [],
+            "updated_at": None,
+            "language": "zh",
+            "wecom_enabled": False,
+            "wecom_webhook_url": None,
+            "wecom_mentions": [],
         }
+    raw_wallets = row["wallet_addresses"] or "[]"
+    try:
+        wallets = _json_loads(raw_wallets)
+        if not isinstance(wallets, list):
+            wallets = []
+    except json.JSONDecodeError:
+        wallets = [addr.strip() for addr in raw_wallets.split(",") if addr.strip()]
+    # init_db() guarantees every column below exists, so index directly.
+    language = row["language"]
+    language = language.lower() if isinstance(language, str) else "zh"
+    if language not in {"zh", "en"}:
+        language = "zh"
+    return {
+        "telegram_bot_token": row["telegram_bot_token"],
+        "telegram_chat_id": row["telegram_chat_id"],
+        "wallet_addresses": wallets,
+        "updated_at": row["updated_at"],
+        "language": language,
+        "wecom_enabled": bool(row["wecom_enabled"]),
+        "wecom_webhook_url": row["wecom_webhook_url"],
+        "wecom_mentions": _parse_mentions(row["wecom_mentions"]),
+    }
+
+
+def _parse_mentions(raw: Optional[str]) -> List[str]:
+    # Stored as a JSON array; rows written before that hold a comma list
+    # (which may well be a single bare number, e.g. a mobile to @).
+    if not raw:
+        return []
+    if raw.startswith("["):
+        try:
+            return _json_loads(raw)
+        except json.JSONDecodeError:
+            pass
+    return [item for item in raw.split(",") if item]
 
 
 def upsert_user_config(
@@ -200,13 +509,15 @@ def upsert_user_config(
     wallet_addresses: List[str],
     language: str,
 ) -> Dict[str, Any]:
-    payload = json.dumps(wallet_addresses)
-    updated_at = datetime.now(timezone.utc).isoformat()
+    payload = _json_dumps(wallet_addresses)
+    updated_at = _now_iso()
     language_value = (language or "zh").lower()
     if language_value not in {"zh", "en"}:
         language_value = "zh"
-    with get_db() as conn:
-        conn.execute(
+    with _writer() as conn:
+        # RETURNING hands back the stored row (including the WeCom columns this
+        # upsert doesn't touch) without a second SELECT.
+        row = conn.execute(
             """
             INSERT INTO user_configs (user_id, telegram_bot_token, telegram_chat_id, wallet_addresses, updated_at, language)
             VALUES (?, ?, ?, ?, ?, ?)
@@ -216,22 +527,22 @@ def upsert_user_config(
                 wallet_addresses = excluded.wallet_addresses,
                 updated_at = excluded.updated_at,
                 language = excluded.language
+            RETURNING *
             """,
             (user_id, telegram_bot_token, telegram_chat_id, payload, updated_at, language_value),
-        )
-        conn.commit()
-    return get_user_config(user_id)
+        ).fetchone()
+    return _user_config_from_row(row)
 
 
 def get_wecom_config(user_id: int) -> Dict[str, Any]:
-    record = get_user_config(user_id)
-    mentions = record.get("wecom_mentions") or []
-    if isinstance(mentions, str):
-        mentions = [item for item in mentions.split(",") if item]
+    return _wecom_from_config(get_user_config(user_id))
+
+
+def _wecom_from_config(record: Dict[str, Any]) -> Dict[str, Any]:
     return {
         "enabled": bool(record.get("wecom_enabled")),
         "webhook_url": record.get("wecom_webhook_url"),
-        "mentions": mentions,
+        "mentions": record.get("wecom_mentions") or [],
     }
 
 
@@ -242,8 +553,9 @@ def upsert_wecom_config(
     webhook_url: Optional[str],
     mentions: Optional[List[str]],
 ) -> Dict[str, Any]:
-    mentions_value = ",".join([item.strip() for item in mentions or [] if item.strip()])
-    with get_db() as conn:
+    mentions_value = [item.strip() for item in mentions or [] if item.strip()]
+    webhook_value = (webhook_url or "").strip() or None
+    with _writer() as conn:
         conn.execute(
             """
             INSERT INTO user_configs (
@@ -257,17 +569,16 @@ def upsert_wecom_config(
                 wecom_webhook_url = excluded.wecom_webhook_url,
                 wecom_mentions = excluded.wecom_mentions
             """,
-            (user_id, 1 if enabled else 0, (webhook_url or "").strip() or None, mentions_value or None),
+            (user_id, 1 if enabled else 0, webhook_value, _json_dumps(mentions_value) if mentions_value else None),
         )
-        conn.commit()
-    return get_wecom_config(user_id)
+    return {
+        "enabled": bool(enabled),
+        "webhook_url": webhook_value,
+        "mentions": mentions_value,
+    }
 
 
-def get_binance_follow_config(user_id: int) -> Dict[str, Any]:
-    with get_db() as conn:
-        cursor = conn.execute(
-            """
-            SELECT
+_BINANCE_FOLLOW_COLUMNS = """
                 binance_follow_enabled,
                 binance_wallet_address,
                 binance_mode,
@@ -280,9 +591,13 @@ def get_binance_follow_config(user_id: int) -> Dict[str, Any]:
                 binance_baseline_balance,
                 binance_follow_status,
                 binance_follow_stop_reason
-            FROM user_configs
-            WHERE user_id = ?
-            """,
+"""
+
+
+def get_binance_follow_config(user_id: int) -> Dict[str, Any]:
+    with get_db() as conn:
+        cursor = conn.execute(
+            f"SELECT {_BINANCE_FOLLOW_COLUMNS} FROM user_configs WHERE user_id = ?",
             (user_id,),
         )
         row = cursor.fetchone()
@@ -301,6 +616,29 @@ def get_binance_follow_config(user_id: int) -> Dict[str, Any]:
             "status": "disabled",
             "stop_reason": None,
         }
+    return _binance_follow_from_row(row)
+
+
+def list_binance_follow_configs(enabled_only: bool = False) -> List[Dict[str, Any]]:
+    """Return every user's Binance follow config in one query, each with a ``user_id`` key."""
+    query = f"""
+        SELECT c.user_id, {_BINANCE_FOLLOW_COLUMNS}
+        FROM user_configs c
+        JOIN users u ON u.id = c.user_id
+    """
+    if enabled_only:
+        query += " WHERE c.binance_follow_enabled = 1"
+    with get_db() as conn:
+        rows = conn.execute(query).fetchall()
+    configs: List[Dict[str, Any]] = []
+    for row in rows:
+        config = _binance_follow_from_row(row)
+        config["user_id"] = row["user_id"]
+        configs.append(config)
+    return configs
+
+
+def _binance_follow_from_row(row: sqlite3.Row) -> Dict[str, Any]:
     return {
         "enabled": bool(row["binance_follow_enabled"]),
         "wallet_address": row["binance_wallet_address"] or "",
@@ -335,7 +673,8 @@ def upsert_binance_follow_config(
 ) -> Dict[str, Any]:
     wallet_address = (wallet_address or "").strip().lower()
     normalized_mode = mode.lower() if mode in {"fixed", "percentage"} else "fixed"
-    with get_db() as conn:
+    status_value = status or ("active" if enabled else "disabled")
+    with _writer() as conn:
         conn.execute(
             """
             INSERT INTO user_configs (
@@ -379,12 +718,26 @@ def upsert_binance_follow_config(
                 encrypt_value(api_key),
                 encrypt_value(api_secret),
                 baseline_balance,
-                status or ("active" if enabled else "disabled"),
+                status_value,
                 stop_reason,
             ),
         )
-        conn.commit()
-    return get_binance_follow_config(user_id)
+    # Same shape get_binance_follow_config() would read back, built from the
+    # plaintext we already have instead of re-selecting and decrypting.
+    return {
+        "enabled": bool(enabled),
+        "wallet_address": wallet_address,
+        "mode": normalized_mode,
+        "amount": amount or 0.0,
+        "stop_loss_amount": stop_loss_amount or 0.0,
+        "max_position": max_position or 0.0,
+        "min_order_size": min_order_size or 0.0,
+        "api_key": (api_key or "").strip() or None,
+        "api_secret": (api_secret or "").strip() or None,
+        "baseline_balance": baseline_balance,
+        "status": status_value,
+        "stop_reason": stop_reason,
+    }
 
 
 def update_binance_follow_status(
@@ -412,12 +765,62 @@ def update_binance_follow_status(
     if not assignments:
         return
     values.append(user_id)
-    with get_db() as conn:
+    with _writer() as conn:
         conn.execute(
             f"UPDATE user_configs SET {', '.join(assignments)} WHERE user_id = ?",
             values,
         )
-        conn.commit()
+
+
+_BINANCE_STATUS_COLUMNS = {
+    "enabled": "binance_follow_enabled",
+    "status": "binance_follow_status",
+    "stop_reason": "binance_follow_stop_reason",
+    "baseline_balance": "binance_baseline_balance",
+}
+
+
+def bulk_update_binance_follow_status(
+    updates: Dict[int, Dict[str, Any]],
+) -> None:
+    """Apply many update_binance_follow_status() changes in one transaction.
+
+    ``updates`` maps user_id to the keyword arguments that function accepts.
+    Rows touching the same set of fields share one executemany().
+    """
+    batches: Dict[Tuple[str, ...], List[List[Any]]] = {}
+    for user_id, fields in updates.items():
+        keys = tuple(key for key in _BINANCE_STATUS_COLUMNS if fields.get(key) is not None)
+        if not keys:
+            continue
+        row: List[Any] = [
+            (1 if fields["enabled"] else 0) if key == "enabled" else fields[key]
+            for key in keys
+        ]
+        row.append(user_id)
+        batches.setdefault(keys, []).append(row)
+    if not batches:
+        return
+    with _writer() as conn:
+        for keys, rows in batches.items():
+            assignments = ", ".join(f"{_BINANCE_STATUS_COLUMNS[key]} = ?" for key in keys)
+            conn.executemany(f"UPDATE user_configs SET {assignments} WHERE user_id = ?", rows)
+
+
+_BULK_USER_FIELDS = frozenset({"last_reminder_at", "subscription_end", "trial_end"})
+
+
+def bulk_update_user_field(
+    field: str,
+    values: List[Tuple[Any, int]],
+) -> None:
+    """Set one users column for many rows: ``values`` is ``[(value, user_id), ...]``."""
+    if field not in _BULK_USER_FIELDS:
+        raise ValueError(f"Unsupported bulk update field: {field}")
+    if not values:
+        return
+    with _writer() as conn:
+        conn.executemany(f"UPDATE users SET {field} = ? WHERE id = ?", values)
 
 
 def update_user(user_id: int, **fields: Any) -> None:
@@ -426,13 +829,16 @@ def update_user(user_id: int, **fields: Any) -> None:
     columns = ", ".join(f"{key} = ?" for key in fields.keys())
     values = list(fields.values())
     values.append(user_id)
-    with get_db() as conn:
+    with _writer() as conn:
         conn.execute(f"UPDATE users SET {columns} WHERE id = ?", values)
-        conn.commit()
 
 
-def upsert_email_verification(email: str, code: str, expires_at: str) -> None:
-    with get_db() as conn:
+def upsert_email_verification(
+    email: str,
+    code: str,
+    expires_at: str,
+) -> None:
+    with _writer() as conn:
         conn.execute(
             """
             INSERT INTO email_verifications (email, code, expires_at)
@@ -443,30 +849,39 @@ def upsert_email_verification(email: str, code: str, expires_at: str) -> None:
             """,
             (email.lower(), code, expires_at),
         )
-        conn.commit()
 
 
-def consume_email_verification(email: str, code: str) -> bool:
-    with get_db() as conn:
-        cursor = conn.execute(
-            "SELECT code, expires_at FROM email_verifications WHERE email = ?",
-            (email.lower(),),
-        )
-        row = cursor.fetchone()
-        if not row:
-            return False
-        stored_code = row[0]
-        expires_at = row[1]
-        if stored_code != code:
-            return False
-        try:
-            expiry = datetime.fromisoformat(expires_at)
-        except ValueError:
-            return False
-        conn.execute("DELETE FROM email_verifications WHERE email = ?", (email.lower(),))
-        conn.commit()
-        return expiry >= datetime.utcnow()
+def consume_email_verification(
+    email: str,
+    code: str,
+) -> bool:
+    # Fetch-and-delete in one statement; a wrong code matches nothing, so the
+    # pending verification survives, as before.
+    with _writer() as conn:
+        row = conn.execute(
+            "DELETE FROM email_verifications WHERE email = ? AND code = ? RETURNING expires_at",
+            (email.lower(), code),
+        ).fetchone()
+    if not row:
+        return False
+    try:
+        expiry = datetime.fromisoformat(row[0])
+    except ValueError:
+        return False
+    if expiry.tzinfo is None:  # stored as naive UTC
+        expiry = expiry.replace(tzinfo=_UTC)
+    return expiry >= datetime.now(_UTC)
+
+
+def _ensure_schema() -> None:
+    """Run init_db() only for a new database or one from an older schema."""
+    if DB_PATH.exists():
+        with get_db() as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= _SCHEMA_VERSION:
+            return
+    init_db()
 
 
 # Initialise database when module is imported
-init_db()
+_ensure_schema()
@@ -9,24 +9,24 @@ project_root = os.path.dirname(backend_dir)
 sys.path.insert(0, project_root)
 
 # 使用绝对导入
-from backend.database import get_user_config, get_wecom_config, list_users
+from backend.database import list_users_with_configs
 from backend.monitor_service import MonitorRegistry
 
 def main():
     print("=== 用户列表 ===")
-    users = list_users()
+    users = list_users_with_configs()
     for user in users:
         user_id = user["id"]
         print(f"\n用户 ID: {user_id}, 邮箱: {user.get('email', 'N/A')}")
         
         print("\n--- 监控配置 ---")
-        config = get_user_config(user_id)
+        config = user["config"]
         print(f"Telegram Chat ID: {config.get('telegram_chat_id')}")
         print(f"钱包地址: {config.get('wallet_addresses', [])}")
         print(f"语言: {config.get('language', 'zh')}")
         
         print("\n--- 企业微信配置 ---")
-        wecom = get_wecom_config(user_id)
+        wecom = user["wecom"]
         print(f"启用: {wecom.get('enabled', False)}")
         print(f"Webhook URL: {wecom.get('webhook_url', 'N/A')}")
         print(f"手机号: {wecom.get('mentions', [])}")
@@ -1,16 +1,22 @@
 import argparse
 from ast import literal_eval
-from collections import deque
 import logging
 import os
+import queue
+import struct
+import sys
+import threading
+import time
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Iterable, Optional
+from urllib.parse import quote_plus
 
 from trader import HyperliquidTrader, TraderConfig, StrategyConfig
 
-import requests
+import urllib3
+from urllib3.util.retry import Retry
 from hyperliquid_monitor.monitor import HyperliquidMonitor
 from hyperliquid_monitor.types import Trade
 
@@ -25,9 +31,61 @@ if not logger.handlers:
     logging.basicConfig(level=logging.INFO)
 
 RECENT_TRADES_LIMIT = 1000
-_recent_trade_order = deque()
-_recent_trade_keys = set()
-_startup_timestamp = datetime.now(timezone.utc)
+# Fixed-capacity FIFO of recent trade keys: a ring buffer for eviction
+# order plus a set for membership.
+_recent_ring: list[bytes] = []
+_recent_pos = 0
+_recent_keys: set[bytes] = set()
+# tx_hash is a trade's identity; size/price are packed alongside it only
+# because one transaction can produce several fills for the same wallet.
+_TRADE_KEY_FILLS = struct.Struct("<dd")
+
+_UTC8 = timezone(timedelta(hours=8))
+# Notifications report the copy-trade direction, i.e. the opposite side.
+_SIDE_FLIP = {"SELL": "BUY", "BUY": "SELL"}
+_TRADE_MESSAGE_TEMPLATE = (
+    "New trade detected:\n"
+    "Address: %s\n"
+    "Coin: %s\n"
+    "Side: %s\n"
+    "Size: %s\n"
+    "Price: %s\n"
+    "Type: %s\n"
+    "Tx Hash: %s\n"
+    "Time: %s"
+)
+# Epoch seconds; trades older than this are history replayed on subscribe.
+_startup_ts = time.time()
+
+# Keep-alive pool for Telegram posts, so bursts of trades reuse one TLS
+# connection instead of handshaking per message. 429/5xx are retried with
+# backoff (honouring Retry-After) before send_telegram_message sees them.
+# urllib3 is used directly: the body is already encoded, so requests'
+# session/adapter layer would only add per-call overhead.
+_TG_POOL = urllib3.PoolManager(
+    num_pools=4,
+    maxsize=64,
+    retries=Retry(
+        total=3,
+        backoff_factor=0.2,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"POST"}),
+        raise_on_status=False,
+    ),
+)
+
+# Trade notifications are handed to a single sender thread so the monitor
+# callback never blocks on Telegram. When the queue is full the oldest
+# pending message is dropped in favour of the newest one.
+TELEGRAM_QUEUE_SIZE = 512
+# Token bucket for the sender, kept under Telegram's ~30 msg/s bot limit.
+TELEGRAM_MAX_PER_SECOND = 25.0
+# Messages queued within this window are joined into one post, up to
+# Telegram's per-message length limit.
+TELEGRAM_BATCH_WINDOW = 0.2
+TELEGRAM_MESSAGE_LIMIT = 4096
+_send_queue: "queue.Queue[tuple[str, str] | None]" = queue.Queue(maxsize=TELEGRAM_QUEUE_SIZE)
+_sender_thread: threading.Thread | None = None
 
 _raw_prefix = Path(__file__).stem.upper()
 if _raw_prefix and _raw_prefix[0].isdigit():
@@ -45,45 +103,54 @@ def _load_env_file(env_file: Path | None = None) -> None:
     if load_dotenv is not None:
         load_dotenv(dotenv_path=str(env_path), override=False)
         return
-    if not env_path.exists():
+    try:
+        lines = env_path.read_text().splitlines()
+    except OSError:
         return
-    with env_path.open() as env_file_handle:
-        for line in env_file_handle:
-            stripped = line.strip()
-            if not stripped or stripped.startswith("#"):
-                continue
-            if "=" not in stripped:
-                continue
-            key, value = stripped.split("=", 1)
-            key = key.strip()
-            value = value.strip()
-            if not key or key in os.environ:
-                continue
-            if len(value) >= 2 and value[0] == value[-1] and value[0] in {"'", '"'}:
-                value = value[1:-1]
-            os.environ[key] = value
+    environ = os.environ
+    for line in lines:
+        stripped = line.strip()
+        if not stripped or stripped[0] == "#":
+            continue
+        key, sep, value = stripped.partition("=")
+        if not sep:
+            continue
+        key = key.rstrip()
+        if not key or key in environ:
+            continue
+        value = value.lstrip()
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in "'\"":
+            value = value[1:-1]
+        environ[key] = value
 
 
 def _parse_wallet_addresses(raw_value: str) -> list[str]:
     try:
         parsed = literal_eval(raw_value)
     except (ValueError, SyntaxError):
-        parsed = [addr.strip() for addr in raw_value.split(",") if addr.strip()]
+        parsed = [addr for addr in (raw.strip() for raw in raw_value.split(",")) if addr]
     if isinstance(parsed, (str, bytes)):
         parsed = [parsed]
     if not isinstance(parsed, (list, tuple, set)):
         parsed = [parsed]
-    return [str(addr).strip() for addr in parsed if str(addr).strip()]
+    return [addr for addr in (str(raw).strip() for raw in parsed) if addr]
+
+
+def _trade_key(trade: Trade) -> bytes:
+    return trade.tx_hash.encode() + _TRADE_KEY_FILLS.pack(float(trade.size), float(trade.price))
 
 
-def _remember_trade(trade_key) -> bool:
-    if trade_key in _recent_trade_keys:
+def _remember_trade(trade_key: bytes) -> bool:
+    global _recent_pos
+    if trade_key in _recent_keys:
         return False
-    if len(_recent_trade_order) >= RECENT_TRADES_LIMIT:
-        oldest = _recent_trade_order.popleft()
-        _recent_trade_keys.discard(oldest)
-    _recent_trade_order.append(trade_key)
-    _recent_trade_keys.add(trade_key)
+    if len(_recent_ring) < RECENT_TRADES_LIMIT:
+        _recent_ring.append(trade_key)
+    else:
+        _recent_keys.discard(_recent_ring[_recent_pos])
+        _recent_ring[_recent_pos] = trade_key
+        _recent_pos = (_recent_pos + 1) % RECENT_TRADES_LIMIT
+    _recent_keys.add(trade_key)
     return True
 
 
@@ -97,6 +164,9 @@ class RuntimeSettings:
 TELEGRAM_BOT_TOKEN: str | None = None
 TELEGRAM_CHAT_ID: str | None = None
 WALLET_ADDRESSES: tuple[str, ...] = ()
+_TELEGRAM_URL: str | None = None
+_TELEGRAM_CHAT_PREFIX: bytes = b""
+_FORM_HEADERS = {"Content-Type": "application/x-www-form-urlencoded"}
 
 
 def _initialise_runtime_settings(
@@ -126,7 +196,7 @@ def _initialise_runtime_settings(
         if env_wallets:
             wallets = _parse_wallet_addresses(env_wallets)
 
-    unique_wallets: tuple[str, ...] = tuple(dict.fromkeys(wallets)) if wallets else ()
+    unique_wallets: tuple[str, ...] = tuple(dict.fromkeys(map(sys.intern, wallets))) if wallets else ()
 
     if require_telegram and (not token or not chat_id):
         raise RuntimeError(
@@ -137,11 +207,13 @@ def _initialise_runtime_settings(
             "No wallet addresses supplied. Use WALLET_ADDRESSES env or --wallet-address option."
         )
 
-    global TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, WALLET_ADDRESSES
+    global TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, WALLET_ADDRESSES, _TELEGRAM_URL, _TELEGRAM_CHAT_PREFIX
 
     TELEGRAM_BOT_TOKEN = token
     TELEGRAM_CHAT_ID = chat_id
     WALLET_ADDRESSES = unique_wallets
+    _TELEGRAM_URL = f"https://api.telegram.org/bot{token}/sendMessage" if token else None
+    _TELEGRAM_CHAT_PREFIX = f"chat_id={quote_plus(chat_id)}&text=".encode() if chat_id else b""
 
     if unique_wallets:
         logger.info(
@@ -158,61 +230,142 @@ def _initialise_runtime_settings(
 
 
 def send_telegram_message(text: str) -> bool:
-    if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
+    if not _TELEGRAM_URL or not TELEGRAM_CHAT_ID:
         raise RuntimeError("Telegram credentials not initialised before sending message")
 
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    payload = {"chat_id": TELEGRAM_CHAT_ID, "text": text}
+    body = _TELEGRAM_CHAT_PREFIX + quote_plus(text).encode()
     try:
-        response = requests.post(url, data=payload, timeout=10)
-        response.raise_for_status()
-    except requests.RequestException as exc:
-        logger.error("Failed to post Telegram message: %s", exc, exc_info=True)
+        response = _TG_POOL.request("POST", _TELEGRAM_URL, body=body, headers=_FORM_HEADERS, timeout=10.0)
+    except urllib3.exceptions.HTTPError as exc:
+        # Expected network failure: the message is enough, a traceback per
+        # failed send would only flood the log during an outage.
+        logger.warning("Failed to post Telegram message: %s", exc)
+        return False
+    if response.status >= 400:
+        logger.error("Failed to post Telegram message: HTTP %s %s", response.status, response.data[:200])
         return False
     return True
 
 
+def _telegram_sender_loop() -> None:
+    rate = TELEGRAM_MAX_PER_SECOND
+    tokens = rate
+    last = time.monotonic()
+    pending: tuple[str, str] | None = None
+    stopping = False
+    while not stopping:
+        item = pending if pending is not None else _send_queue.get()
+        pending = None
+        if item is None:
+            return
+        tx_hashes = [item[0]]
+        texts = [item[1]]
+        size = len(item[1])
+        deadline = time.monotonic() + TELEGRAM_BATCH_WINDOW
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                follower = _send_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if follower is None:
+                stopping = True
+                break
+            if size + 2 + len(follower[1]) > TELEGRAM_MESSAGE_LIMIT:
+                pending = follower
+                break
+            tx_hashes.append(follower[0])
+            texts.append(follower[1])
+            size += 2 + len(follower[1])
+
+        now = time.monotonic()
+        tokens = min(rate, tokens + (now - last) * rate)
+        last = now
+        if tokens < 1.0:
+            time.sleep((1.0 - tokens) / rate)
+            tokens = 1.0
+            last = time.monotonic()
+        tokens -= 1.0
+        try:
+            sent = send_telegram_message("\n\n".join(texts))
+        except Exception:  # pragma: no cover - keep the sender thread alive
+            logger.exception("Unexpected error sending Telegram notification")
+            sent = False
+        if not sent:
+            logger.warning("Telegram notification failed for trades %s", ", ".join(tx_hashes))
+
+
+def _enqueue_telegram_message(tx_hash: str, text: str) -> None:
+    item = (tx_hash, text)
+    while True:
+        try:
+            _send_queue.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                dropped = _send_queue.get_nowait()
+            except queue.Empty:
+                continue
+            if dropped is not None:
+                logger.warning("Telegram send queue full; dropped notification for trade %s", dropped[0])
+
+
+def _start_telegram_sender() -> None:
+    global _sender_thread
+    if _sender_thread is not None and _sender_thread.is_alive():
+        return
+    _sender_thread = threading.Thread(target=_telegram_sender_loop, name="telegram-sender", daemon=True)
+    _sender_thread.start()
+
+
+def _stop_telegram_sender(timeout: float = 5.0) -> None:
+    global _sender_thread
+    thread = _sender_thread
+    if thread is None:
+        return
+    # The sentinel queues behind pending messages, so they are flushed first.
+    _send_queue.put(None)
+    thread.join(timeout)
+    if thread.is_alive():
+        logger.warning("Telegram sender did not drain within %.1fs", timeout)
+    _sender_thread = None
+
+
 def trade_callback(trade: Trade) -> None:
-    global _startup_timestamp
+    # Normalise once to epoch seconds; both the cutoff check and the
+    # UTC+8 display time below work from this value.
     trade_time = trade.timestamp
     if trade_time.tzinfo is None:
         trade_time = trade_time.replace(tzinfo=timezone.utc)
-    if trade_time < _startup_timestamp:
+    trade_ts = trade_time.timestamp()
+    if trade_ts < _startup_ts:
         logger.debug("Ignoring historical trade at %s", trade_time)
         return
 
-    trade_key = (trade.tx_hash, trade.size, trade.price)
-    if not _remember_trade(trade_key):
-        logger.debug("Skipping duplicate trade: %s", trade_key)
+    if not _remember_trade(_trade_key(trade)):
+        logger.debug("Skipping duplicate trade: %s", trade.tx_hash)
         return
 
-    side_sent = trade.side
-    if side_sent == "SELL":
-        side_sent = "BUY"
-    elif side_sent == "BUY":
-        side_sent = "SELL"
-
-    trade_time_utc8 = trade_time.astimezone(timezone(timedelta(hours=8)))
-    trade_time_str = trade_time_utc8.strftime("%Y-%m-%d %H:%M:%S UTC+8")
-    message = (
-        "New trade detected:\n"
-        f"Address: {trade.address}\n"
-        f"Coin: {trade.coin}\n"
-        f"Side: {side_sent}\n"
-        f"Size: {trade.size}\n"
-        f"Price: {trade.price}\n"
-        f"Type: {trade.trade_type}\n"
-        f"Tx Hash: {trade.tx_hash}\n"
-        f"Time: {trade_time_str}"
+    trade_time_str = datetime.fromtimestamp(trade_ts, _UTC8).strftime("%Y-%m-%d %H:%M:%S UTC+8")
+    message = _TRADE_MESSAGE_TEMPLATE % (
+        trade.address,
+        trade.coin,
+        _SIDE_FLIP.get(trade.side, trade.side),
+        trade.size,
+        trade.price,
+        trade.trade_type,
+        trade.tx_hash,
+        trade_time_str,
     )
 
-    if not send_telegram_message(message):
-        logger.warning("Telegram notification failed for trade %s", trade.tx_hash)
+    _enqueue_telegram_message(trade.tx_hash, message)
 
 
 def run_trade_monitor() -> None:
-    global _startup_timestamp
-    _startup_timestamp = datetime.now(timezone.utc)
+    global _startup_ts
+    _startup_ts = time.time()
 
     if WALLET_ADDRESSES:
         try:
@@ -237,11 +390,14 @@ def run_trade_monitor() -> None:
         db_path=None,
     )
 
+    _start_telegram_sender()
     try:
         print("Starting trade monitor... Press Ctrl+C to exit")
         monitor.start()
     except KeyboardInterrupt:
         monitor.stop()
+    finally:
+        _stop_telegram_sender()
 
 
 def _parse_args() -> argparse.Namespace:
@@ -469,7 +625,7 @@ def _resolve_private_key(args: argparse.Namespace) -> str:
 
 
 def _parse_coin_list(raw: str) -> tuple[str, ...]:
-    coins = tuple(symbol.strip().upper() for symbol in raw.split(",") if symbol.strip())
+    coins = tuple(symbol.upper() for symbol in (raw_symbol.strip() for raw_symbol in raw.split(",")) if symbol)
     if not coins:
         raise RuntimeError("At least one coin must be provided via --hl-coins")
     return coins
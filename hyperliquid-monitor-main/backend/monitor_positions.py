@@ -50,6 +50,9 @@ MESSAGE_DELAY_SECONDS = 0.75
 MAX_RETRIES = 3
 RETRY_DELAY = 2
 API_TIMEOUT = 30
+# Telegram/WeCom posts go through one session so repeat sends reuse the pooled
+# TLS connection; monitor_service swaps in a session shared by all users.
+HTTP_SESSION = requests.Session()
 STATE_POSITIONS_KEY = "positions"
 STATE_META_KEY = "meta"
 STATE_META_COINS_KEY = "coins"
@@ -60,6 +63,9 @@ _snapshot_initialized = False
 _websocket_running = False
 _stop_event = threading.Event()
 info_client: Info = Info()
+# (subscription, id) pairs from info_client.subscribe(), so a stop can remove
+# exactly what the last start added before the module is started again.
+_WS_SUBSCRIPTIONS: List[Tuple[Dict[str, Any], int]] = []
 
 SIZE_EPSILON = 1e-9
 
@@ -74,28 +80,44 @@ if _raw_prefix and _raw_prefix[0].isdigit():
 ENV_PREFIX = _raw_prefix.replace("-", "_")
 
 
+# .env path -> signature of the last load. monitor_service injects one dict
+# shared by every per-user copy of this module; standalone runs get their own.
+_ENV_LOAD_STATE: Dict[str, str] = globals().get("_ENV_LOAD_STATE", {})
+
+
 def _load_env_file() -> None:
     env_path = Path(__file__).resolve().parent / ".env"
+    # monitor_service re-executes this module once per user; skip re-parsing an
+    # unchanged .env since existing keys are never overridden anyway.
+    try:
+        signature = f"{env_path}:{env_path.stat().st_mtime_ns}"
+    except OSError:
+        signature = f"{env_path}:missing"
+    if _ENV_LOAD_STATE.get(str(env_path)) == signature:
+        return
+    _ENV_LOAD_STATE[str(env_path)] = signature
     if load_dotenv is not None:
         load_dotenv(dotenv_path=str(env_path), override=False)
         return
-    if not env_path.exists():
+    try:
+        lines = env_path.read_text().splitlines()
+    except OSError:
         return
-    with env_path.open() as env_file:
-        for line in env_file:
-            stripped = line.strip()
-            if not stripped or stripped.startswith("#"):
-                continue
-            if "=" not in stripped:
-                continue
-            key, value = stripped.split("=", 1)
-            key = key.strip()
-            value = value.strip()
-            if not key or key in os.environ:
-                continue
-            if len(value) >= 2 and value[0] == value[-1] and value[0] in {"'", '"'}:
-                value = value[1:-1]
-            os.environ[key] = value
+    environ = os.environ
+    for line in lines:
+        stripped = line.strip()
+        if not stripped or stripped[0] == "#":
+            continue
+        key, sep, value = stripped.partition("=")
+        if not sep:
+            continue
+        key = key.rstrip()
+        if not key or key in environ:
+            continue
+        value = value.lstrip()
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in "'\"":
+            value = value[1:-1]
+        environ[key] = value
 
 
 def _get_env_var(name: str) -> Optional[str]:
@@ -517,15 +539,14 @@ def calculate_position_metrics(coin: str, fills: Sequence[Dict]) -> Dict[str, fl
             "avg_exit_price": 0.0,
         }
 
-    try:
-        coin_fills.sort(key=lambda item: int(item.get("time", 0)))
-    except (ValueError, TypeError) as exc:
-        logger.warning("Error sorting fills for %s: %s", coin, exc)
-
+    # Only order-independent totals and averages are produced, so the fills are
+    # not sorted and prices are accumulated as running sums.
     total_buy_usd = 0.0
     total_sell_usd = 0.0
-    entry_prices: List[float] = []
-    exit_prices: List[float] = []
+    entry_price_sum = 0.0
+    entry_count = 0
+    exit_price_sum = 0.0
+    exit_count = 0
 
     for fill in coin_fills:
         try:
@@ -540,24 +561,25 @@ def calculate_position_metrics(coin: str, fills: Sequence[Dict]) -> Dict[str, fl
         if price <= 0 or size <= 0:
             continue
 
-        trade_value = price * size
         if side == "B":
-            if start_position < 0:
-                total_sell_usd += trade_value
-                exit_prices.append(price)
-            else:
-                total_buy_usd += trade_value
-                entry_prices.append(price)
+            closing = start_position < 0
         elif side == "A":
-            if start_position > 0:
-                total_sell_usd += trade_value
-                exit_prices.append(price)
-            else:
-                total_buy_usd += trade_value
-                entry_prices.append(price)
+            closing = start_position > 0
+        else:
+            continue
+
+        trade_value = price * size
+        if closing:
+            total_sell_usd += trade_value
+            exit_price_sum += price
+            exit_count += 1
+        else:
+            total_buy_usd += trade_value
+            entry_price_sum += price
+            entry_count += 1
 
-    avg_entry_price = sum(entry_prices) / len(entry_prices) if entry_prices else 0.0
-    avg_exit_price = sum(exit_prices) / len(exit_prices) if exit_prices else 0.0
+    avg_entry_price = entry_price_sum / entry_count if entry_count else 0.0
+    avg_exit_price = exit_price_sum / exit_count if exit_count else 0.0
 
     return {
         "total_buy_usd": total_buy_usd,
@@ -1187,7 +1209,7 @@ def send_telegram_message(message: str) -> bool:
 
     for attempt in range(MAX_RETRIES):
         try:
-            response = requests.post(url, data=payload, timeout=API_TIMEOUT)
+            response = HTTP_SESSION.post(url, data=payload, timeout=API_TIMEOUT)
             response.raise_for_status()
             return True
         except requests.exceptions.Timeout:
@@ -1235,7 +1257,7 @@ def send_wecom_message(message: str) -> bool:
         payload["text"]["mentioned_mobile_list"] = mentions  # type: ignore[index]
     for attempt in range(MAX_RETRIES):
         try:
-            response = requests.post(WECOM_WEBHOOK_URL, json=payload, timeout=API_TIMEOUT)
+            response = HTTP_SESSION.post(WECOM_WEBHOOK_URL, json=payload, timeout=API_TIMEOUT)
             response.raise_for_status()
             result = response.json()
             if result.get("errcode") == 0:
@@ -1693,14 +1715,12 @@ def start_websocket_monitoring() -> None:
     logger.info("Starting websocket monitoring for %s wallet(s)", len(addresses))
     for address in addresses:
         try:
-            info_client.subscribe(
+            for subscription in (
                 {"type": "userEvents", "user": address},
-                create_websocket_handler(address),
-            )
-            info_client.subscribe(
                 {"type": "userFills", "user": address},
-                create_websocket_handler(address),
-            )
+            ):
+                subscription_id = info_client.subscribe(subscription, create_websocket_handler(address))
+                _WS_SUBSCRIPTIONS.append((subscription, subscription_id))
             logger.info("Subscribed to websocket streams for %s", address)
         except Exception as exc:
             logger.error("Error subscribing to websocket for %s: %s", address, exc)
@@ -1709,8 +1729,9 @@ def start_websocket_monitoring() -> None:
     logger.info("Websocket monitoring started. Waiting for events...")
 
     try:
-        while not _stop_event.is_set():
-            _stop_event.wait(1)
+        # Nothing to poll: the SDK delivers events on its own thread, so just
+        # block until stop_websocket_monitoring() sets the event.
+        _stop_event.wait()
     except KeyboardInterrupt:
         logger.info("Websocket monitoring stopped by user")
         stop_websocket_monitoring()
@@ -1720,18 +1741,13 @@ def stop_websocket_monitoring() -> None:
     global _websocket_running
     _websocket_running = False
     _stop_event.set()
-    # 尝试清理 websocket 订阅，避免重复订阅错误
-    try:
-        addresses = list(CONFIGURED_ADDRESSES)
-        for address in addresses:
-            try:
-                # 尝试取消订阅（如果 SDK 支持）
-                if hasattr(info_client, 'unsubscribe'):
-                    info_client.unsubscribe({"type": "userEvents", "user": address})
-            except Exception as exc:
-                logger.debug("Error unsubscribing from websocket for %s: %s", address, exc)
-    except Exception as exc:
-        logger.debug("Error during websocket cleanup: %s", exc)
+    # 清理 websocket 订阅，避免重复订阅错误
+    while _WS_SUBSCRIPTIONS:
+        subscription, subscription_id = _WS_SUBSCRIPTIONS.pop()
+        try:
+            info_client.unsubscribe(subscription, subscription_id)
+        except Exception as exc:
+            logger.debug("Error unsubscribing from websocket for %s: %s", subscription.get("user"), exc)
     logger.info("Websocket monitoring stopped")
 
 
@@ -1802,7 +1818,9 @@ def main() -> None:
     try:
         while not _stop_event.is_set():
             schedule.run_pending()
-            _stop_event.wait(60)
+            # Sleep until the next job is due rather than waking every minute.
+            idle = schedule.idle_seconds()
+            _stop_event.wait(60 if idle is None else max(1.0, idle))
     except KeyboardInterrupt:
         logger.info("Monitor stopped by user")
         stop_websocket_monitoring()
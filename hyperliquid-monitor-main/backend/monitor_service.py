@@ -1,42 +1,223 @@
+import builtins
+import functools
+import heapq
 import importlib.util
+import itertools
 import logging
+import marshal
 import os
 import re
 import sys
 import threading
+import time
+import types
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
-from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, Iterable, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
-try:
-    import schedule  # type: ignore
-except ImportError as exc:  # pragma: no cover - schedule is an optional dependency
-    raise RuntimeError(
-        "The 'schedule' package is required for monitoring. Install with `pip install schedule`."
-    ) from exc
+import requests
+from requests.adapters import HTTPAdapter
 
 logger = logging.getLogger(__name__)
 
+try:
+    from .binance_follow_service import dispatch_trade_event
+except Exception as exc:  # pragma: no cover - Binance follow is optional
+    logger.debug("无法加载 Binance 事件处理器：%s", exc)
+    dispatch_trade_event = None
+
 BASE_DIR = Path(__file__).resolve().parent
 MONITOR_POSITIONS_PATH = BASE_DIR / "monitor_positions.py"
 STATE_STORE_PATH = BASE_DIR / "state_store.py"
 STATE_ROOT = BASE_DIR / "state_store"
 STATE_ROOT.mkdir(exist_ok=True)
 DEFAULT_TELEGRAM_BOT_TOKEN = os.getenv("DEFAULT_TELEGRAM_BOT_TOKEN", "").strip()
+_ADDR_SPLIT = re.compile(r"[\s,;]+")
+
 
+def parse_wallet_addresses(entries: Iterable[str]) -> List[str]:
+    """Split free-form wallet input (newlines, spaces, commas, semicolons) into addresses.
 
-class _SchedulerWrapper:
-    """Provide an isolated scheduler per monitor thread."""
+    Entries may each hold several addresses (textarea input, legacy rows).
+    """
+    return [token for entry in entries if entry for token in _ADDR_SPLIT.split(entry.strip()) if token]
+
+# Compiled code for the per-user module files, keyed by path and invalidated
+# on mtime, so starting a monitor only executes them instead of re-parsing.
+# _CODE_CACHE_DIR persists the same thing across processes, like __pycache__.
+_CODE_CACHE: Dict[Path, Tuple[int, types.CodeType]] = {}
+_CODE_CACHE_LOCK = threading.Lock()
+_CODE_CACHE_DIR = STATE_ROOT / "_cache"
+
+
+def _load_code(path: Path, mtime_ns: int) -> types.CodeType:
+    cache_file = _CODE_CACHE_DIR / f"{path.name}.{mtime_ns}.pyc"
+    magic = importlib.util.MAGIC_NUMBER
+    try:
+        data = cache_file.read_bytes()
+    except OSError:
+        data = b""
+    if data.startswith(magic):
+        try:
+            code = marshal.loads(data[len(magic):])
+        except (EOFError, ValueError, TypeError):
+            code = None
+        if isinstance(code, types.CodeType) and code.co_filename == str(path):
+            return code
+
+    code = compile(path.read_bytes(), str(path), "exec")
+    try:
+        _CODE_CACHE_DIR.mkdir(exist_ok=True)
+        tmp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+        tmp_file.write_bytes(magic + marshal.dumps(code))
+        os.replace(tmp_file, cache_file)
+        for stale in _CODE_CACHE_DIR.glob(f"{path.name}.*.pyc"):
+            if stale != cache_file:
+                stale.unlink(missing_ok=True)
+    except OSError as exc:
+        logger.debug("Unable to write code cache for %s: %s", path.name, exc)
+    return code
+
+
+def _compiled_code(path: Path) -> types.CodeType:
+    mtime_ns = path.stat().st_mtime_ns
+    with _CODE_CACHE_LOCK:
+        cached = _CODE_CACHE.get(path)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+    code = _load_code(path, mtime_ns)
+    with _CODE_CACHE_LOCK:
+        _CODE_CACHE[path] = (mtime_ns, code)
+    return code
+
+
+def _builtins_with_imports(overrides: Dict[str, types.ModuleType]) -> Dict[str, Any]:
+    """A builtins namespace whose ``from X import ...`` resolves X from overrides.
+
+    Lets each user's monitor_positions bind its own state_store without
+    swapping entries in the process-wide sys.modules.
+    """
+
+    def _import(name, globals=None, locals=None, fromlist=(), level=0):
+        if level == 0 and fromlist and name in overrides:
+            return overrides[name]
+        return builtins.__import__(name, globals, locals, fromlist, level)
+
+    namespace = dict(builtins.__dict__)
+    namespace["__import__"] = _import
+    return namespace
+
+
+def _exec_module(
+    module_name: str,
+    path: Path,
+    imports: Optional[Dict[str, types.ModuleType]] = None,
+    initial_globals: Optional[Dict[str, Any]] = None,
+) -> types.ModuleType:
+    code = _compiled_code(path)
+    module = types.ModuleType(module_name)
+    # The code object already carries str(path) from compile().
+    module.__file__ = code.co_filename
+    if initial_globals:
+        module.__dict__.update(initial_globals)
+    if imports:
+        module.__builtins__ = _builtins_with_imports(imports)  # type: ignore[attr-defined]
+    exec(code, module.__dict__)
+    return module
+
+
+# Shared by every per-user monitor_positions copy so the .env file is parsed
+# once per process rather than once per user (kept in memory, not os.environ).
+_ENV_LOAD_STATE: Dict[str, str] = {}
+
+SNAPSHOT_INTERVAL_SECONDS = 4 * 60 * 60
+
+# Snapshots are outbound HTTP (Hyperliquid, then Telegram/WeCom). Running them
+# here keeps config updates, monitor start-up and the scheduler thread from
+# waiting on a slow upstream.
+_SNAPSHOT_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="snap")
+
+# One connection pool for every user's Telegram/WeCom sends (injected as the
+# module's HTTP_SESSION), sized for the snapshot pool plus websocket handlers.
+_HTTP_SESSION = requests.Session()
+_HTTP_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+
+def _submit_snapshot(user_id: int, send: Callable[..., None], *args: Any, **kwargs: Any) -> None:
+    def _log_failure(future: Future) -> None:
+        exc = future.exception()
+        if exc is not None:
+            logger.error("Snapshot failed for user %s: %s", user_id, exc, exc_info=exc)
+
+    _SNAPSHOT_POOL.submit(send, *args, **kwargs).add_done_callback(_log_failure)
+
+
+class _SnapshotScheduler:
+    """Run every monitor's periodic job from one thread and a deadline heap.
+
+    Each user has at most one job. add() returns a token; remove() with a stale
+    token is a no-op, so a monitor thread that outlives its restart can't
+    cancel its successor's job. Removed jobs are dropped lazily from the heap.
+    """
 
     def __init__(self) -> None:
-        self._scheduler = schedule.Scheduler()
+        self._cond = threading.Condition()
+        self._heap: List[Tuple[float, int, int]] = []
+        self._jobs: Dict[int, Tuple[int, float, Callable[[], None]]] = {}
+        self._tokens = itertools.count()
+        self._thread: Optional[threading.Thread] = None
 
-    def every(self, *args, **kwargs):
-        return self._scheduler.every(*args, **kwargs)
+    def add(self, user_id: int, interval: float, job: Callable[[], None]) -> int:
+        with self._cond:
+            token = next(self._tokens)
+            self._jobs[user_id] = (token, interval, job)
+            heapq.heappush(self._heap, (time.monotonic() + interval, token, user_id))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="monitor-scheduler", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+            return token
+
+    def remove(self, user_id: int, token: int) -> None:
+        with self._cond:
+            current = self._jobs.get(user_id)
+            if current is not None and current[0] == token:
+                del self._jobs[user_id]
+
+    def _next_due(self) -> Tuple[int, Callable[[], None]]:
+        # Called with the condition held; blocks until a live job is due.
+        while True:
+            while self._heap:
+                _, token, user_id = self._heap[0]
+                current = self._jobs.get(user_id)
+                if current is not None and current[0] == token:
+                    break
+                heapq.heappop(self._heap)
+            if not self._heap:
+                self._cond.wait()
+                continue
+            now = time.monotonic()
+            due = self._heap[0][0]
+            if due > now:
+                self._cond.wait(due - now)
+                continue
+            _, token, user_id = heapq.heappop(self._heap)
+            _, interval, job = self._jobs[user_id]
+            heapq.heappush(self._heap, (now + interval, token, user_id))
+            return user_id, job
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                user_id, job = self._next_due()
+            try:
+                job()
+            except Exception as exc:
+                logger.error("Scheduled job failed for user %s: %s", user_id, exc)
 
-    def run_pending(self) -> None:
-        self._scheduler.run_pending()
+
+_scheduler = _SnapshotScheduler()
 
 
 @dataclass
@@ -59,44 +240,55 @@ class UserMonitor:
         self._module = None
         self._state_module = None
         self._skip_snapshot_on_start = False
+        # Serialises start/stop/update for this user now that the registry
+        # lock no longer covers them; re-entrant because update() calls both.
+        self._lifecycle_lock = threading.RLock()
 
     def start(self) -> None:
-        skip_snapshot = self._skip_snapshot_on_start
-        self._skip_snapshot_on_start = False
-        if self._thread and self._thread.is_alive():
-            return
-        if not self.config.wallet_addresses:
-            logger.warning("User %s has no wallet addresses; monitor not started", self.config.user_id)
-            return
-        # 允许只使用企业微信推送，不需要 Telegram 凭证
-        has_telegram = bool(self.config.telegram_bot_token and self.config.telegram_chat_id)
-        has_wecom = bool(self.config.wecom_enabled and self.config.wecom_webhook_url)
-        if not has_telegram and not has_wecom:
-            logger.warning("User %s missing both Telegram and WeCom credentials; monitor not started", self.config.user_id)
-            return
-        if not has_telegram:
-            logger.info("User %s starting monitor with WeCom only (no Telegram credentials)", self.config.user_id)
+        with self._lifecycle_lock:
+            skip_snapshot = self._skip_snapshot_on_start
+            self._skip_snapshot_on_start = False
+            if self._thread and self._thread.is_alive():
+                return
+            if not self.config.wallet_addresses:
+                logger.warning("User %s has no wallet addresses; monitor not started", self.config.user_id)
+                return
+            # 允许只使用企业微信推送，不需要 Telegram 凭证
+            has_telegram = bool(self.config.telegram_bot_token and self.config.telegram_chat_id)
+            has_wecom = bool(self.config.wecom_enabled and self.config.wecom_webhook_url)
+            if not has_telegram and not has_wecom:
+                logger.warning("User %s missing both Telegram and WeCom credentials; monitor not started", self.config.user_id)
+                return
+            if not has_telegram:
+                logger.info("User %s starting monitor with WeCom only (no Telegram credentials)", self.config.user_id)
 
-        self._stop_event.clear()
-        self._thread = threading.Thread(target=self._run, args=(skip_snapshot,), name=f"user-monitor-{self.config.user_id}", daemon=True)
-        self._thread.start()
-        logger.info("Started monitor thread for user %s", self.config.user_id)
+            # A fresh event per session: a previous thread that outlived stop()'s
+            # join must not be able to stop this one.
+            self._stop_event = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(skip_snapshot, self._stop_event), name=f"user-monitor-{self.config.user_id}", daemon=True)
+            self._thread.start()
+            logger.info("Started monitor thread for user %s", self.config.user_id)
 
     def stop(self) -> None:
-        self._stop_event.set()
-        module = self._module
-        if module is not None:
-            try:
-                module._stop_event.set()  # type: ignore[attr-defined]
-                module.stop_websocket_monitoring()
-            except Exception as exc:  # pragma: no cover - defensive stop
-                logger.debug("Error while stopping websocket monitoring for user %s: %s", self.config.user_id, exc)
-        if self._thread and self._thread.is_alive() and threading.current_thread() is not self._thread:
-            self._thread.join(timeout=30)
-        self._thread = None
-        self._module = None
-        self._state_module = None
-        logger.info("Stopped monitor for user %s", self.config.user_id)
+        with self._lifecycle_lock:
+            self._stop_event.set()
+            module = self._module
+            if module is not None:
+                try:
+                    module._stop_event.set()  # type: ignore[attr-defined]
+                    module.stop_websocket_monitoring()
+                except Exception as exc:  # pragma: no cover - defensive stop
+                    logger.debug("Error while stopping websocket monitoring for user %s: %s", self.config.user_id, exc)
+            thread = self._thread
+            if thread and thread.is_alive() and threading.current_thread() is not thread:
+                # Both stop events are set, so the thread only has its cleanup left;
+                # don't hold the caller (often an HTTP request) for long if it lags.
+                thread.join(timeout=5)
+                if thread.is_alive():
+                    logger.warning("Monitor thread for user %s still running after stop; continuing", self.config.user_id)
+            self._thread = None
+            # The loaded modules are kept: the next start() only reconfigures them.
+            logger.info("Stopped monitor for user %s", self.config.user_id)
 
     def update(
         self,
@@ -109,145 +301,167 @@ class UserMonitor:
         wecom_webhook_url: Optional[str],
         wecom_mentions: Tuple[str, ...],
     ) -> None:
-        old_language = self.config.language
-        normalized_language = (language or "zh").lower()
-        if normalized_language not in {"zh", "en"}:
-            normalized_language = "zh"
-        restart_needed = (
-            telegram_bot_token != self.config.telegram_bot_token
-            or telegram_chat_id != self.config.telegram_chat_id
-            or wallet_addresses != self.config.wallet_addresses
-            or wecom_enabled != self.config.wecom_enabled
-            or wecom_webhook_url != self.config.wecom_webhook_url
-            or wecom_mentions != self.config.wecom_mentions
-        )
-        if restart_needed:
-            logger.info("User %s: Configuration changed, restart needed. Changes: telegram_token=%s, telegram_chat_id=%s, wallets=%s, wecom_enabled=%s, wecom_webhook=%s, wecom_mentions=%s",
-                       self.config.user_id,
-                       telegram_bot_token != self.config.telegram_bot_token,
-                       telegram_chat_id != self.config.telegram_chat_id,
-                       wallet_addresses != self.config.wallet_addresses,
-                       wecom_enabled != self.config.wecom_enabled,
-                       wecom_webhook_url != self.config.wecom_webhook_url,
-                       wecom_mentions != self.config.wecom_mentions)
-        language_changed = normalized_language != old_language
-        self.config = _UserConfig(
-            user_id=self.config.user_id,
-            telegram_bot_token=telegram_bot_token,
-            telegram_chat_id=telegram_chat_id,
-            wallet_addresses=wallet_addresses,
-            language=normalized_language,
-            wecom_enabled=wecom_enabled,
-            wecom_webhook_url=wecom_webhook_url,
-            wecom_mentions=wecom_mentions,
-        )
-        # 如果配置改变但不需要重启，或者启用了推送渠道，需要发送快照
-        telegram_enabled = bool(self.config.telegram_chat_id)
-        # 只要启用了推送渠道（Telegram 或企业微信），就发送快照
-        # 这样可以确保用户保存配置后能收到快照消息
-        should_send_snapshot_after_update = (
-            not restart_needed and (
-                language_changed 
-                or self.config.wecom_enabled 
-                or telegram_enabled
-            ) and self.config.wallet_addresses  # 确保有钱包地址
-        )
+        with self._lifecycle_lock:
+            old_language = self.config.language
+            normalized_language = (language or "zh").lower()
+            if normalized_language not in {"zh", "en"}:
+                normalized_language = "zh"
+            running = self._thread is not None and self._thread.is_alive()
+            config = self.config
+            if running and self._module is not None and (
+                telegram_bot_token,
+                telegram_chat_id,
+                wallet_addresses,
+                normalized_language,
+                wecom_enabled,
+                wecom_webhook_url,
+                wecom_mentions,
+            ) == (
+                config.telegram_bot_token,
+                config.telegram_chat_id,
+                config.wallet_addresses,
+                config.language,
+                config.wecom_enabled,
+                config.wecom_webhook_url,
+                config.wecom_mentions,
+            ):
+                # Same settings saved again: the running module already has
+                # them, only the confirmation snapshot a save produces is due.
+                if config.wallet_addresses and (config.wecom_enabled or config.telegram_chat_id):
+                    _submit_snapshot(
+                        config.user_id,
+                        self._module.send_wallet_snapshot,  # type: ignore[attr-defined]
+                        config.wallet_addresses,
+                        force=True,
+                    )
+                return
+            # Only the wallet set is baked into the websocket subscriptions.
+            # Credentials, mentions and language are read by the module at
+            # send time, so they are pushed into the running module below.
+            restart_needed = wallet_addresses != self.config.wallet_addresses
+            credentials_changed = (
+                telegram_bot_token != self.config.telegram_bot_token
+                or telegram_chat_id != self.config.telegram_chat_id
+                or wecom_enabled != self.config.wecom_enabled
+                or wecom_webhook_url != self.config.wecom_webhook_url
+            )
+            if restart_needed or credentials_changed:
+                logger.info("User %s: Configuration changed, restart needed=%s. Changes: telegram_token=%s, telegram_chat_id=%s, wallets=%s, wecom_enabled=%s, wecom_webhook=%s",
+                           self.config.user_id,
+                           restart_needed,
+                           telegram_bot_token != self.config.telegram_bot_token,
+                           telegram_chat_id != self.config.telegram_chat_id,
+                           restart_needed,
+                           wecom_enabled != self.config.wecom_enabled,
+                           wecom_webhook_url != self.config.wecom_webhook_url)
+            language_changed = normalized_language != old_language
+            self.config = _UserConfig(
+                user_id=self.config.user_id,
+                telegram_bot_token=telegram_bot_token,
+                telegram_chat_id=telegram_chat_id,
+                wallet_addresses=wallet_addresses,
+                language=normalized_language,
+                wecom_enabled=wecom_enabled,
+                wecom_webhook_url=wecom_webhook_url,
+                wecom_mentions=wecom_mentions,
+            )
+            # 如果配置改变但不需要重启，或者启用了推送渠道，需要发送快照
+            telegram_enabled = bool(self.config.telegram_chat_id)
+            # 只要启用了推送渠道（Telegram 或企业微信），就发送快照
+            # 这样可以确保用户保存配置后能收到快照消息
+            should_send_snapshot_after_update = (
+                not restart_needed and (
+                    language_changed 
+                    or self.config.wecom_enabled 
+                    or telegram_enabled
+                ) and self.config.wallet_addresses  # 确保有钱包地址
+            )
         
-        logger.debug("User %s: update() called - restart_needed=%s, wecom_enabled=%s, telegram_enabled=%s, should_send_snapshot=%s",
-                    self.config.user_id, restart_needed, self.config.wecom_enabled, telegram_enabled, should_send_snapshot_after_update)
+            logger.debug("User %s: update() called - restart_needed=%s, wecom_enabled=%s, telegram_enabled=%s, should_send_snapshot=%s",
+                        self.config.user_id, restart_needed, self.config.wecom_enabled, telegram_enabled, should_send_snapshot_after_update)
         
-        if self._module is not None:
-            try:
-                # 更新模块中的配置
-                # Telegram 只有在 chat_id 存在时才启用
-                setattr(self._module, "TELEGRAM_ENABLED", telegram_enabled)
-                setattr(self._module, "TELEGRAM_BOT_TOKEN", self.config.telegram_bot_token)
-                setattr(self._module, "TELEGRAM_CHAT_ID", self.config.telegram_chat_id)
-                setattr(self._module, "CONFIGURED_ADDRESSES", self.config.wallet_addresses)
-                setattr(self._module, "LANGUAGE", self.config.language)
-                setattr(self._module, "WECOM_ENABLED", self.config.wecom_enabled)
-                setattr(self._module, "WECOM_WEBHOOK_URL", self.config.wecom_webhook_url)
-                setattr(self._module, "WECOM_MENTIONS", self.config.wecom_mentions)
-                # 如果配置改变但不需要重启，强制发送快照
-                if should_send_snapshot_after_update:
-                    try:
+            if self._module is not None and running:
+                try:
+                    # 更新模块中的配置
+                    self._module.__dict__.update(self._module_settings())
+                    # 如果配置改变但不需要重启，强制发送快照
+                    if should_send_snapshot_after_update:
                         logger.info("User %s: Configuration updated, sending snapshot (telegram=%s, wecom=%s, restart_needed=%s, wallets=%s)", 
                                    self.config.user_id,
                                    telegram_enabled,
                                    self.config.wecom_enabled,
                                    restart_needed,
                                    len(self.config.wallet_addresses))
-                        self._module.send_wallet_snapshot(  # type: ignore[attr-defined]
+                        _submit_snapshot(
+                            self.config.user_id,
+                            self._module.send_wallet_snapshot,  # type: ignore[attr-defined]
                             self.config.wallet_addresses,
                             force=True,
                         )
-                        logger.info("User %s: Snapshot send command executed", self.config.user_id)
-                    except Exception as exc:
-                        logger.error(
-                            "Failed to send forced snapshot after config update for user %s: %s",
-                            self.config.user_id,
-                            exc,
-                            exc_info=True,
-                        )
-            except Exception as exc:
-                logger.error("Unable to update module config for user %s: %s", self.config.user_id, exc, exc_info=True)
-        elif should_send_snapshot_after_update:
-            # 如果模块不存在但需要发送快照，启动监控
-            logger.info("User %s: Module not initialized, starting monitor to send snapshot", self.config.user_id)
-            self._skip_snapshot_on_start = False
-            self.start()
+                except Exception as exc:
+                    logger.error("Unable to update module config for user %s: %s", self.config.user_id, exc, exc_info=True)
+            elif should_send_snapshot_after_update:
+                # 如果监控未运行但需要发送快照，启动监控
+                logger.info("User %s: Monitor not running, starting monitor to send snapshot", self.config.user_id)
+                self._skip_snapshot_on_start = False
+                self.start()
             
-        if restart_needed:
-            logger.info("User %s: Restarting monitor with snapshot", self.config.user_id)
-            self._skip_snapshot_on_start = False
-            # 重置快照初始化标志，确保重启后发送快照
-            if self._module is not None:
-                setattr(self._module, "_snapshot_initialized", False)
-            self.stop()
-            # 等待线程完全停止
-            if self._thread and self._thread.is_alive():
-                self._thread.join(timeout=5)
-            self.start()
-        elif not self._thread or not self._thread.is_alive():
-            # 如果监控没有运行，启动它
-            logger.info("User %s: Monitor not running, starting it", self.config.user_id)
-            self._skip_snapshot_on_start = False
-            self.start()
+            if restart_needed:
+                logger.info("User %s: Restarting monitor with snapshot", self.config.user_id)
+                self._skip_snapshot_on_start = False
+                # 重置快照初始化标志，确保重启后发送快照
+                if self._module is not None:
+                    setattr(self._module, "_snapshot_initialized", False)
+                self.stop()
+                self.start()
+            elif running and not (
+                (self.config.telegram_bot_token and self.config.telegram_chat_id)
+                or (self.config.wecom_enabled and self.config.wecom_webhook_url)
+            ):
+                # 推送渠道已全部移除，start() 也不会再启动，直接停止
+                logger.info("User %s: No notification channel left, stopping monitor", self.config.user_id)
+                self.stop()
+            elif not self._thread or not self._thread.is_alive():
+                # 如果监控没有运行，启动它
+                logger.info("User %s: Monitor not running, starting it", self.config.user_id)
+                self._skip_snapshot_on_start = False
+                self.start()
 
     # Internal helpers -----------------------------------------------------
 
+    def _module_settings(self) -> Dict[str, Any]:
+        """Config globals pushed into the user's monitor_positions module."""
+        config = self.config
+        return {
+            # Telegram 只有在 chat_id 存在时才启用
+            "TELEGRAM_ENABLED": bool(config.telegram_chat_id),
+            "TELEGRAM_BOT_TOKEN": config.telegram_bot_token,
+            "TELEGRAM_CHAT_ID": config.telegram_chat_id,
+            "CONFIGURED_ADDRESSES": config.wallet_addresses,
+            "LANGUAGE": config.language,
+            "WECOM_ENABLED": config.wecom_enabled,
+            "WECOM_WEBHOOK_URL": config.wecom_webhook_url,
+            "WECOM_MENTIONS": config.wecom_mentions,
+        }
+
     def _load_state_store_module(self, module_name: str):
-        spec = importlib.util.spec_from_file_location(module_name, STATE_STORE_PATH)
-        module = importlib.util.module_from_spec(spec)
-        if spec.loader is None:
-            raise RuntimeError("Failed to load state_store module")
-        spec.loader.exec_module(module)
-        return module
-
-    def _load_monitor_module(self, module_name: str):
-        spec = importlib.util.spec_from_file_location(module_name, MONITOR_POSITIONS_PATH)
-        module = importlib.util.module_from_spec(spec)
-        if spec.loader is None:
-            raise RuntimeError("Failed to load monitor_positions module")
-        spec.loader.exec_module(module)
-        return module
+        return _exec_module(module_name, STATE_STORE_PATH)
+
+    def _load_monitor_module(self, module_name: str, state_module):
+        return _exec_module(
+            module_name,
+            MONITOR_POSITIONS_PATH,
+            imports={"backend.state_store": state_module},
+            initial_globals={"_ENV_LOAD_STATE": _ENV_LOAD_STATE},
+        )
 
     def _prepare_modules(self) -> None:
         user_id = self.config.user_id
         state_module_name = f"backend.state_store_user_{user_id}"
         monitor_module_name = f"backend.monitor_positions_user_{user_id}"
 
-        original_state_store = sys.modules.get("backend.state_store")
-
         state_module = self._load_state_store_module(state_module_name)
-        sys.modules["backend.state_store"] = state_module
-        monitor_module = self._load_monitor_module(monitor_module_name)
-
-        # Restore original shared module for the rest of the app
-        if original_state_store is not None:
-            sys.modules["backend.state_store"] = original_state_store
-        else:
-            sys.modules.pop("backend.state_store", None)
+        monitor_module = self._load_monitor_module(monitor_module_name, state_module)
 
         self._state_module = state_module
         self._module = monitor_module
@@ -264,29 +478,16 @@ class UserMonitor:
         state_module = self._state_module
         assert module is not None and state_module is not None
 
-        # 设置 Telegram 配置：只有在 chat_id 存在时才启用
-        telegram_enabled = bool(self.config.telegram_chat_id)
-        module.TELEGRAM_ENABLED = telegram_enabled  # type: ignore[attr-defined]
-        module.TELEGRAM_BOT_TOKEN = self.config.telegram_bot_token  # type: ignore[attr-defined]
-        module.TELEGRAM_CHAT_ID = self.config.telegram_chat_id  # type: ignore[attr-defined]
-        module.CONFIGURED_ADDRESSES = self.config.wallet_addresses  # type: ignore[attr-defined]
-        module._stop_event = threading.Event()  # type: ignore[attr-defined]
-        module._snapshot_initialized = False  # type: ignore[attr-defined]  # 重置快照初始化标志，确保重启后发送快照
-        module.schedule = _SchedulerWrapper()  # type: ignore[attr-defined]
-        module.LANGUAGE = getattr(self.config, "language", "zh")  # type: ignore[attr-defined]
-        module.USER_ID = self.config.user_id  # type: ignore[attr-defined]
-        module.WECOM_ENABLED = getattr(self.config, "wecom_enabled", False)  # type: ignore[attr-defined]
-        module.WECOM_WEBHOOK_URL = getattr(self.config, "wecom_webhook_url", None)  # type: ignore[attr-defined]
-        module.WECOM_MENTIONS = getattr(self.config, "wecom_mentions", ())  # type: ignore[attr-defined]
-        try:
-            from .binance_follow_service import dispatch_trade_event
-
-            def _event_processor(event: Dict[str, Any], user_id: int = self.config.user_id) -> None:
-                dispatch_trade_event(user_id, event)
-
-            module.EVENT_PROCESSOR = _event_processor  # type: ignore[attr-defined]
-        except Exception as exc:  # pragma: no cover - defensive
-            logger.debug("无法注入 Binance 事件处理器：%s", exc)
+        settings = self._module_settings()
+        settings.update(
+            _stop_event=threading.Event(),
+            _snapshot_initialized=False,  # 重置快照初始化标志，确保重启后发送快照
+            USER_ID=self.config.user_id,
+            HTTP_SESSION=_HTTP_SESSION,
+        )
+        module.__dict__.update(settings)
+        if dispatch_trade_event is not None:
+            module.EVENT_PROCESSOR = functools.partial(dispatch_trade_event, self.config.user_id)  # type: ignore[attr-defined]
 
         # Refresh state store configuration to pick custom path/env
         try:
@@ -294,77 +495,72 @@ class UserMonitor:
         except Exception as exc:
             logger.debug("State store refresh failed for user %s: %s", self.config.user_id, exc)
 
-    def _start_monitoring(self, skip_snapshot: bool = False) -> None:
+    def _start_monitoring(self, skip_snapshot: bool = False) -> Optional[int]:
         module = self._module
         assert module is not None
 
         if not skip_snapshot:
-            try:
-                logger.info("User %s: Starting monitoring with snapshot, telegram=%s, wecom=%s", 
-                           self.config.user_id, 
-                           bool(self.config.telegram_bot_token and self.config.telegram_chat_id),
-                           bool(self.config.wecom_enabled and self.config.wecom_webhook_url))
-                # 强制发送快照（通过 send_wallet_snapshot 而不是 monitor_all_wallets）
-                # 这样可以确保即使 _snapshot_initialized 为 True 也会发送
-                if hasattr(module, "send_wallet_snapshot"):
-                    module.send_wallet_snapshot(self.config.wallet_addresses, force=True)  # type: ignore[attr-defined]
-                else:
-                    module.monitor_all_wallets()  # type: ignore[attr-defined]
-            except Exception as exc:
-                logger.error("Initial snapshot failed for user %s: %s", self.config.user_id, exc, exc_info=True)
+            logger.info("User %s: Starting monitoring with snapshot, telegram=%s, wecom=%s", 
+                       self.config.user_id, 
+                       bool(self.config.telegram_bot_token and self.config.telegram_chat_id),
+                       bool(self.config.wecom_enabled and self.config.wecom_webhook_url))
+            # 强制发送快照（通过 send_wallet_snapshot 而不是 monitor_all_wallets）
+            # 这样可以确保即使 _snapshot_initialized 为 True 也会发送
+            if hasattr(module, "send_wallet_snapshot"):
+                _submit_snapshot(self.config.user_id, module.send_wallet_snapshot, self.config.wallet_addresses, force=True)  # type: ignore[attr-defined]
+            else:
+                _submit_snapshot(self.config.user_id, module.monitor_all_wallets)  # type: ignore[attr-defined]
 
-        websocket_thread = threading.Thread(
-            target=module.start_websocket_monitoring,
-            name=f"user-monitor-ws-{self.config.user_id}",
-            daemon=True,
+        # Schedule snapshot every 4 hours
+        return _scheduler.add(
+            self.config.user_id,
+            SNAPSHOT_INTERVAL_SECONDS,
+            lambda: _submit_snapshot(
+                self.config.user_id,
+                module.send_wallet_snapshot,
+                self.config.wallet_addresses,
+                force=True,
+            ),
         )
-        websocket_thread.start()
 
-        # Schedule snapshot every 4 hours
+    def _run(self, skip_snapshot: bool, stop_event: threading.Event) -> None:
+        start_time = time.monotonic()
+        job_token: Optional[int] = None
+        module = None
+        module_stop = None
         try:
-            module.schedule.every(4).hours.do(  # type: ignore[attr-defined]
-                lambda: module.send_wallet_snapshot(
-                    self.config.wallet_addresses,
-                    force=True,
-                )
-            )
-        except Exception as exc:
-            logger.error("Failed to schedule snapshot for user %s: %s", self.config.user_id, exc)
-
-    def _scheduler_loop(self) -> None:
-        module = self._module
-        assert module is not None
-        while not self._stop_event.is_set():
+            # Modules are loaded once per UserMonitor; restarts rebind config.
+            if self._module is None:
+                self._prepare_modules()
+            self._configure_module()
+            module = self._module
+            module_stop = module._stop_event  # type: ignore[union-attr]
+            job_token = self._start_monitoring(skip_snapshot=skip_snapshot)
+            # The websocket wait loop runs on this thread rather than a second
+            # one; it returns once stop() sets the module's stop event.
             try:
-                module.schedule.run_pending()  # type: ignore[attr-defined]
+                module.start_websocket_monitoring()  # type: ignore[union-attr]
             except Exception as exc:
-                logger.error("Scheduler loop error for user %s: %s", self.config.user_id, exc)
-            self._stop_event.wait(60)
-
-    def _run(self, skip_snapshot: bool = False) -> None:
-        start_time = datetime.utcnow()
-        try:
-            self._prepare_modules()
-            self._configure_module()
-            self._start_monitoring(skip_snapshot=skip_snapshot)
-            self._scheduler_loop()
+                logger.error("Websocket monitoring failed for user %s: %s", self.config.user_id, exc)
+            stop_event.wait()
         except Exception as exc:  # pragma: no cover - defensive logging
             logger.error("Monitor loop crashed for user %s: %s", self.config.user_id, exc)
         finally:
-            self._stop_event.set()
-            module = self._module
-            if module is not None:
+            if job_token is not None:
+                _scheduler.remove(self.config.user_id, job_token)
+            stop_event.set()
+            # Only tear the websocket down if a newer session hasn't already
+            # reconfigured the shared module with its own stop event.
+            if module is not None and module._stop_event is module_stop:  # type: ignore[union-attr]
                 try:
                     module._stop_event.set()  # type: ignore[attr-defined]
                     module.stop_websocket_monitoring()
                 except Exception:
                     pass
-            self._module = None
-            self._state_module = None
             logger.info(
                 "Monitor thread exited for user %s after %s seconds",
                 self.config.user_id,
-                (datetime.utcnow() - start_time).total_seconds(),
+                time.monotonic() - start_time,
             )
 
 
@@ -374,19 +570,13 @@ class MonitorRegistry:
         self._monitors: Dict[int, UserMonitor] = {}
 
     @staticmethod
-    def _normalize_addresses(addresses: Iterable[str]) -> Tuple[str, ...]:
-        tokens = []
-        seen = set()
-        for entry in addresses:
-            if not entry:
-                continue
-            for token in re.split(r"[\s,;]+", entry.strip()):
-                token = token.strip().lower()
-                if not token or token in seen:
-                    continue
-                tokens.append(token)
-                seen.add(token)
-        return tuple(tokens)
+    def _normalize_tokens(addresses: Iterable[str]) -> Tuple[str, ...]:
+        # Entries arrive one address each: the API splits user input with
+        # parse_wallet_addresses() and the DB migration split legacy rows.
+        # dict.fromkeys dedupes while keeping first-seen order. Interned so
+        # users watching the same wallet share one string and compares are
+        # identity checks.
+        return tuple(dict.fromkeys(sys.intern(token) for token in (entry.strip().lower() for entry in addresses if entry) if token))
 
     def configure_user(
         self,
@@ -400,7 +590,7 @@ class MonitorRegistry:
         wecom_webhook_url: Optional[str],
         wecom_mentions: Iterable[str],
     ) -> None:
-        wallets_tuple = self._normalize_addresses(wallet_addresses)
+        wallets_tuple = self._normalize_tokens(wallet_addresses)
         wallets_tuple = wallets_tuple[:2]
         token = (telegram_bot_token or "").strip()
         if not token and DEFAULT_TELEGRAM_BOT_TOKEN:
@@ -411,50 +601,55 @@ class MonitorRegistry:
         if lang not in {"zh", "en"}:
             lang = "zh"
         webhook = (wecom_webhook_url or "").strip() or None
-        mentions_tuple = tuple(item.strip() for item in wecom_mentions if item.strip())
+        mentions_tuple = tuple(item for item in (raw.strip() for raw in wecom_mentions) if item)
         wecom_active = bool(wecom_enabled and webhook)
 
-        with self._lock:
-            existing = self._monitors.get(user_id)
-            if not token or not chat_id or not wallets_tuple:
-                if existing:
-                    existing.stop()
-                    self._monitors.pop(user_id, None)
-                    logger.info("Disabled monitor for user %s (incomplete configuration)", user_id)
-                return
-
+        # The lock only guards the dict; start/stop/update join threads and
+        # load modules, so they run outside it and other users don't queue.
+        if not token or not chat_id or not wallets_tuple:
+            with self._lock:
+                existing = self._monitors.pop(user_id, None)
             if existing:
-                existing.update(
-                    telegram_bot_token=token,
-                    telegram_chat_id=chat_id,
-                    wallet_addresses=wallets_tuple,
-                    language=lang,
-                    wecom_enabled=wecom_active,
-                    wecom_webhook_url=webhook,
-                    wecom_mentions=mentions_tuple,
-                )
-                return
+                existing.stop()
+                logger.info("Disabled monitor for user %s (incomplete configuration)", user_id)
+            return
 
-            monitor = UserMonitor(
-                _UserConfig(
-                    user_id=user_id,
-                    telegram_bot_token=token,
-                    telegram_chat_id=chat_id,
-                    wallet_addresses=wallets_tuple,
-                    language=lang,
-                    wecom_enabled=wecom_active,
-                    wecom_webhook_url=webhook,
-                    wecom_mentions=mentions_tuple,
+        with self._lock:
+            existing = self._monitors.get(user_id)
+            if existing is None:
+                monitor = UserMonitor(
+                    _UserConfig(
+                        user_id=user_id,
+                        telegram_bot_token=token,
+                        telegram_chat_id=chat_id,
+                        wallet_addresses=wallets_tuple,
+                        language=lang,
+                        wecom_enabled=wecom_active,
+                        wecom_webhook_url=webhook,
+                        wecom_mentions=mentions_tuple,
+                    )
                 )
+                self._monitors[user_id] = monitor
+
+        if existing:
+            existing.update(
+                telegram_bot_token=token,
+                telegram_chat_id=chat_id,
+                wallet_addresses=wallets_tuple,
+                language=lang,
+                wecom_enabled=wecom_active,
+                wecom_webhook_url=webhook,
+                wecom_mentions=mentions_tuple,
             )
-            self._monitors[user_id] = monitor
-            monitor.start()
+            return
+        monitor.start()
 
     def stop_all(self) -> None:
         with self._lock:
-            for monitor in list(self._monitors.values()):
-                monitor.stop()
+            monitors = list(self._monitors.values())
             self._monitors.clear()
+        for monitor in monitors:
+            monitor.stop()
 
 
 registry = MonitorRegistry()
@@ -489,21 +684,32 @@ def shutdown_monitors() -> None:
 
 def initialise_monitors_from_db() -> None:
     try:
-        from .database import get_user_config, list_users
+        from .database import list_users_with_configs
     except Exception as exc:  # pragma: no cover
         logger.error("Failed to load user configurations: %s", exc)
         return
 
-    for user in list_users():
-        config = get_user_config(user["id"])
-        configure_user_monitor(
-            user["id"],
-            telegram_bot_token=config.get("telegram_bot_token"),
-            telegram_chat_id=config.get("telegram_chat_id"),
-            wallet_addresses=config.get("wallet_addresses", []),
-            language=config.get("language", "zh"),
-            wecom_enabled=bool(config.get("wecom_enabled")),
-            wecom_webhook_url=config.get("wecom_webhook_url"),
-            wecom_mentions=config.get("wecom_mentions", []),
-        )
+    def _configure_one(user: Dict[str, Any]) -> None:
+        config = user["config"]
+        try:
+            configure_user_monitor(
+                user["id"],
+                telegram_bot_token=config.get("telegram_bot_token"),
+                telegram_chat_id=config.get("telegram_chat_id"),
+                wallet_addresses=config.get("wallet_addresses", []),
+                language=config.get("language", "zh"),
+                wecom_enabled=bool(config.get("wecom_enabled")),
+                wecom_webhook_url=config.get("wecom_webhook_url"),
+                wecom_mentions=config.get("wecom_mentions", []),
+            )
+        except Exception as exc:
+            logger.error("Failed to start monitor for user %s: %s", user["id"], exc)
+
+    # One query for every user's config, then start the monitors in parallel;
+    # each start loads modules and spawns a thread, which adds up serially.
+    users = list_users_with_configs()
+    if not users:
+        return
+    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4, len(users))) as executor:
+        list(executor.map(_configure_one, users))
 
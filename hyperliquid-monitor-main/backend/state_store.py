@@ -4,6 +4,7 @@ from __future__ import annotations
 import json
 import logging
 import os
+import tempfile
 from pathlib import Path
 from threading import Lock
 from typing import Any, Callable, Dict, Optional, cast
@@ -149,10 +150,21 @@ def save_state_snapshot(state: Dict[str, Any]) -> None:
         _notify_redis_issue("Redis client unavailable; wrote state to local file only")
 
     with _STATE_LOCK:
+        tmp_path: Optional[str] = None
         try:
             _STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
-            with _STATE_FILE.open("w") as handle:
+            # Write to a sibling temp file and rename so readers never see a torn file.
+            fd, tmp_path = tempfile.mkstemp(prefix=f".{_STATE_FILE.name}.", suffix=".tmp", dir=_STATE_FILE.parent)
+            with os.fdopen(fd, "w") as handle:
                 handle.write(serialized)
+            os.replace(tmp_path, _STATE_FILE)
+            tmp_path = None
         except OSError as exc:
             logger.error("Failed to write state file: %s", exc)
+        finally:
+            if tmp_path is not None:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
 